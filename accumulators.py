@@ -0,0 +1,84 @@
+import numpy as np
+
+
+class FieldAccumulator:
+    # Running per-cell statistics of every `every`-th field of a Simulation (or
+    # of a region of it, as a tuple of slices), updated in place without
+    # keeping any frames:
+    #
+    #   mean              time average of u
+    #   minimum, maximum  envelope of u
+    #   variance()        Welford's running variance of u
+    #   mean_intensity()  time average of u**2, as variance + mean**2, which
+    #                     has no cancellation and needs no pass of its own
+    #
+    # Once attached, Simulation.run_steps() and step() feed it after every
+    # `every` physical steps. The statistics can be read at any time (hold the
+    # GUI worker's lock while it is running), and reset() starts them over.
+    # close() detaches it.
+    def __init__(self, simulation, every=1, region=None, dtype=np.float64):
+        if every < 1:
+            raise ValueError("every must be a positive number of steps.")
+        self.simulation = simulation
+        self.every = every
+        self.region = (slice(None), slice(None)) if region is None else region
+        shape = simulation.tank.u[self.region].shape
+        self.mean = np.empty(shape, dtype=dtype)
+        self.minimum = np.empty(shape, dtype=dtype)
+        self.maximum = np.empty(shape, dtype=dtype)
+        # Sum of squared deviations from the running mean
+        self._m2 = np.empty(shape, dtype=dtype)
+        self._delta = np.empty(shape, dtype=dtype)
+        self._scratch = np.empty(shape, dtype=dtype)
+        self.reset()
+        simulation.accumulators.append(self)
+
+    def reset(self):
+        self.count = 0
+        self.mean.fill(0)
+        self.minimum.fill(np.inf)
+        self.maximum.fill(-np.inf)
+        self._m2.fill(0)
+        self._countdown = self.every
+
+    def steps_until_frame(self):
+        return self._countdown
+
+    def advance(self, n_steps, field, time):
+        # Called by Simulation.run_steps after n_steps (at most
+        # steps_until_frame()) physical steps
+        self._countdown -= n_steps
+        if self._countdown == 0:
+            self._countdown = self.every
+            self.add(field)
+
+    def add(self, field):
+        u = field[self.region]
+        delta, scratch = self._delta, self._scratch
+        self.count += 1
+        weight = 1 / self.count
+        np.subtract(u, self.mean, out=delta)
+        np.multiply(delta, weight, out=scratch)
+        self.mean += scratch
+        np.subtract(u, self.mean, out=scratch)
+        scratch *= delta
+        self._m2 += scratch
+        np.minimum(self.minimum, u, out=self.minimum)
+        np.maximum(self.maximum, u, out=self.maximum)
+
+    def variance(self, ddof=0):
+        if self.count <= ddof:
+            return np.full(self._m2.shape, np.nan)
+        return self._m2 / (self.count - ddof)
+
+    def mean_intensity(self):
+        if self.count == 0:
+            return np.full(self.mean.shape, np.nan)
+        return self._m2 / self.count + self.mean**2
+
+    def peak_amplitude(self):
+        return np.maximum(self.maximum, -self.minimum)
+
+    def close(self):
+        if self in self.simulation.accumulators:
+            self.simulation.accumulators.remove(self)
@@ -0,0 +1,142 @@
+import os
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+
+def update_rows(u, u_prev, u_next, damping, twice, lap, dx2, dy2, coeff, r0, r1):
+    # Write interior rows r0..r1-1 of u_next. twice and lap are interior-shaped
+    # scratch arrays; damping is the folded decay/boundary multiplier.
+    twice = twice[r0 - 1:r1 - 1]
+    lap = lap[r0 - 1:r1 - 1]
+    inner = u_next[r0:r1, 1:-1]
+
+    np.multiply(u[r0:r1, 1:-1], 2, out=twice)
+    np.add(u[r0:r1, 2:], u[r0:r1, :-2], out=lap)
+    lap -= twice
+    lap /= dx2
+    np.add(u[r0 + 1:r1 + 1, 1:-1], u[r0 - 1:r1 - 1, 1:-1], out=inner)
+    inner -= twice
+    inner /= dy2
+    lap += inner
+    lap *= coeff
+
+    np.subtract(twice, u_prev[r0:r1, 1:-1], out=inner)
+    inner += lap
+
+    # Decay and boundary mask, folded into one cached multiplier
+    inner *= damping[r0 - 1:r1 - 1]
+
+
+class NumpyBackend:
+    # Reference backend: the in-place NumPy kernel, applied to whole row slabs
+    name = "numpy"
+
+    def update_field(self, tank, u, u_prev, u_next):
+        self._update_rows(tank, u, u_prev, u_next, 1, tank.resolution - 1)
+
+    def scatter_add(self, target, index, values):
+        np.add.at(target, index, values)
+
+    def _update_rows(self, tank, u, u_prev, u_next, r0, r1):
+        # Python float coefficients, so that float32 fields are stepped in float32
+        update_rows(u, u_prev, u_next, tank.damping, tank._twice, tank._lap,
+                    tank.dx**2, tank.dy**2, float(tank.c**2 * tank.dt**2), r0, r1)
+
+
+class ThreadedBackend(NumpyBackend):
+    # Splits the interior into row tiles stepped concurrently; NumPy releases
+    # the GIL inside ufunc loops, so tiles run in parallel on large grids
+    name = "threaded"
+
+    def __init__(self, n_threads=None):
+        if n_threads is None:
+            n_threads = int(os.environ.get("INTERFERENCE_THREADS", os.cpu_count() or 1))
+        self.n_threads = max(1, n_threads)
+        self._pool = ThreadPoolExecutor(max_workers=self.n_threads)
+
+    def update_field(self, tank, u, u_prev, u_next):
+        bounds = np.linspace(1, tank.resolution - 1, self.n_threads + 1).astype(int)
+        tiles = [(r0, r1) for r0, r1 in zip(bounds[:-1], bounds[1:]) if r0 < r1]
+        futures = [self._pool.submit(self._update_rows, tank, u, u_prev, u_next, r0, r1)
+                   for r0, r1 in tiles]
+        for future in futures:
+            future.result()
+
+
+_numba_kernels = None
+
+
+def _load_numba_kernels():
+    # numba is imported and the kernels compiled on first use only, so that
+    # importing this module stays cheap
+    global _numba_kernels
+    if _numba_kernels is not None:
+        return _numba_kernels
+    try:
+        import numba
+    except ImportError:
+        raise ImportError("The numba backend requires the numba package.") from None
+
+    @numba.njit(parallel=True, cache=True)
+    def fused_update(u, u_prev, u_next, damping, dx2, dy2, coeff):
+        # Single pass over the interior: stencil, leapfrog and damping per cell
+        n, m = u.shape
+        for i in numba.prange(1, n - 1):
+            for j in range(1, m - 1):
+                twice = 2 * u[i, j]
+                lap = ((u[i, j + 1] + u[i, j - 1] - twice) / dx2 +
+                       (u[i + 1, j] + u[i - 1, j] - twice) / dy2)
+                value = (twice - u_prev[i, j]) + coeff * lap
+                u_next[i, j] = value * damping[i - 1, j - 1]
+
+    @numba.njit(cache=True)
+    def scatter_add(target, index, values):
+        for k in range(index.shape[0]):
+            target[index[k]] += values[k]
+
+    _numba_kernels = (fused_update, scatter_add)
+    return _numba_kernels
+
+
+class NumbaBackend(NumpyBackend):
+    # Fused single-pass JIT kernel; requires numba
+    name = "numba"
+
+    def __init__(self):
+        self._fused_update, self._scatter_add = _load_numba_kernels()
+
+    def update_field(self, tank, u, u_prev, u_next):
+        self._fused_update(u, u_prev, u_next, tank.damping, tank.dx**2, tank.dy**2,
+                           tank.c**2 * tank.dt**2)
+
+    def scatter_add(self, target, index, values):
+        if target.ndim == 1 and isinstance(index, np.ndarray):
+            self._scatter_add(target, index, values)
+        else:
+            np.add.at(target, index, values)
+
+
+BACKENDS = {
+    "numpy": NumpyBackend,
+    "numba": NumbaBackend,
+    "threaded": ThreadedBackend,
+}
+
+
+def get_backend(name=None):
+    # Resolve a backend by name, falling back to NumPy when an optional
+    # dependency is missing. The INTERFERENCE_BACKEND environment variable
+    # selects the default.
+    if name is None:
+        name = os.environ.get("INTERFERENCE_BACKEND", "numpy")
+    if not isinstance(name, str):
+        return name
+    if name not in BACKENDS:
+        raise ValueError(f"Invalid backend '{name}'. Choose one of: {', '.join(BACKENDS)}.")
+    try:
+        return BACKENDS[name]()
+    except ImportError as exc:
+        warnings.warn(f"{exc} Falling back to the numpy backend.")
+        return NumpyBackend()
@@ -0,0 +1,66 @@
+import sys
+import time
+
+import numpy as np
+
+from simulation import Tank, BOUNDARY_TYPES
+
+# Reflected-energy benchmark for the tank boundary types.
+#
+# A Gaussian pulse starts at the centre of a 20 x 20 region of interest (ROI).
+# Each boundary type is run on tanks padded by a fraction of the ROI size, and
+# the ROI is compared against a reference tank large enough that nothing
+# reflected from its walls returns within the measurement window. The
+# reflected fraction is the residual energy in the ROI at the end of the run
+# divided by the pulse energy in the ROI at the start.
+
+ROI_SIZE = 20
+ROI_CELLS = 200
+DX = ROI_SIZE / ROI_CELLS
+PULSE_WIDTH = 0.5
+END_TIME = 2.5  # long enough for reflections off a 50% padded tank to return (c = 10)
+OVERHEADS = (0.0, 0.1, 0.3, 0.5)
+
+
+def make_tank(pad, boundary_type):
+    resolution = ROI_CELLS + 1 + 2 * pad
+    size = (resolution - 1) * DX
+    tank = Tank(size, size, resolution, [], decay_factor=1.0, time_stepping="cfl")
+    tank.set_boundary_type(boundary_type)
+    centre = size / 2
+    pulse = np.exp(-((tank.X - centre)**2 + (tank.Y - centre)**2) / (2 * PULSE_WIDTH**2))
+    tank.u[:] = pulse
+    tank.u_prev[:] = pulse
+    return tank
+
+
+def roi(tank, pad):
+    return tank.u[pad:pad + ROI_CELLS + 1, pad:pad + ROI_CELLS + 1]
+
+
+def run(tank):
+    tank.advance(int(round(END_TIME / tank.dt)))
+    return tank
+
+
+def main():
+    reference_pad = ROI_CELLS
+    initial_energy = np.sum(roi(make_tank(reference_pad, "open"), reference_pad)**2)
+    reference = roi(run(make_tank(reference_pad, "open")), reference_pad)
+
+    print(f"{'boundary':<12}{'overhead':>10}{'cells':>10}{'reflected':>12}{'time [s]':>10}")
+    for boundary_type in BOUNDARY_TYPES:
+        for overhead in OVERHEADS:
+            pad = int(round(overhead * ROI_CELLS / 2))
+            tank = make_tank(pad, boundary_type)
+            start = time.perf_counter()
+            run(tank)
+            elapsed = time.perf_counter() - start
+            reflected = np.sum((roi(tank, pad) - reference)**2) / initial_energy
+            print(f"{boundary_type:<12}{overhead:>9.0%}{tank.resolution**2:>10}"
+                  f"{reflected:>12.2e}{elapsed:>10.2f}")
+        sys.stdout.flush()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+import sys
+import time
+
+import numpy as np
+
+from simulation import create_simulation, TIME_STEPPING_POLICIES
+
+# Accuracy of float32 stepping against float64 over long runs.
+#
+# The default GUI scene (two slits on the bottom wall, reflective boundary) is
+# run in both precisions under each time-stepping policy. At each reporting
+# time the float32 field is compared with the float64 one: the relative L2
+# error and the largest absolute difference relative to the float64 peak.
+# Step times are measured on the same runs.
+
+RESOLUTION = 200
+REPORT_TIMES = (1.0, 2.5, 5.0, 10.0)  # simulated seconds
+
+
+def make_simulation(precision, policy):
+    return create_simulation({'bottom': 2}, resolution=RESOLUTION, precision=precision,
+                             time_stepping=policy)
+
+
+def main():
+    print(f"{'policy':<8}{'time':>8}{'steps':>8}{'rel. L2':>12}{'max/peak':>12}"
+          f"{'f64 ms':>9}{'f32 ms':>9}")
+    for policy in TIME_STEPPING_POLICIES:
+        reference = make_simulation("float64", policy)
+        single = make_simulation("float32", policy)
+        steps_done = 0
+        for report_time in REPORT_TIMES:
+            steps = int(round(report_time / reference.clock_step())) - steps_done
+            start = time.perf_counter()
+            reference.run_steps(steps)
+            double_time = time.perf_counter() - start
+            start = time.perf_counter()
+            single.run_steps(steps)
+            single_time = time.perf_counter() - start
+            steps_done += steps
+
+            u64, u32 = reference.tank.u, single.tank.u.astype(np.float64)
+            relative = np.linalg.norm(u32 - u64) / np.linalg.norm(u64)
+            peak = np.abs(u32 - u64).max() / np.abs(u64).max()
+            print(f"{policy:<8}{reference.time:>8.2f}{steps_done:>8}{relative:>12.2e}{peak:>12.2e}"
+                  f"{1e3 * double_time / steps:>9.3f}{1e3 * single_time / steps:>9.3f}")
+            sys.stdout.flush()
+
+
+if __name__ == '__main__':
+    main()
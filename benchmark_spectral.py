@@ -0,0 +1,80 @@
+import sys
+import time
+
+import numpy as np
+
+from simulation import Tank
+
+# Numerical dispersion of the finite-difference and spectral kernels.
+#
+# A Gaussian-enveloped carrier is released at rest in the middle of a tank and
+# propagated for PROPAGATION_TIME under the "cfl" policy at several grid
+# spacings. The result is compared with the exact solution of the continuous
+# wave equation for the continuous packet, independent of the grid either
+# kernel runs on. The packet stays clear of the edges, so the boundary type
+# does not matter.
+
+SIZE = 20.0
+WAVELENGTH = 1.0
+ENVELOPE = 1.0
+PROPAGATION_TIME = 0.5  # simulated seconds
+POINTS_PER_WAVELENGTH = (2, 3, 4, 6, 10, 20)
+# Spacing of the grid the exact solution is summed on, in wavelengths; the
+# packet spectrum is negligible beyond its Nyquist wavenumber
+REFERENCE_SPACING = 0.1
+
+
+def initial_field(tank):
+    x, y = tank.X - SIZE / 2, tank.Y - SIZE / 2
+    return np.exp(-(x**2 + y**2) / (2 * ENVELOPE**2)) * np.cos(2 * np.pi * x / WAVELENGTH)
+
+
+def exact_field(n, dx, c, t):
+    # The continuous Fourier transform of the packet, known in closed form,
+    # propagated by cos(c |k| t) and transformed back by a Fourier sum over a
+    # periodic domain twice the tank size (so that no image of the packet
+    # reaches the tank), on a grid refined until it is REFERENCE_SPACING fine.
+    # Returns the field at the tank's n x n cells spaced by dx.
+    refine = int(np.ceil(dx / (REFERENCE_SPACING * WAVELENGTH)))
+    m = 2 * n * refine
+    spacing = dx / refine
+    k = 2 * np.pi * np.fft.fftfreq(m, spacing)
+    kx, ky = k, k[:, np.newaxis]
+    k0 = 2 * np.pi / WAVELENGTH
+    centre = SIZE / 2
+    spectrum = (np.pi * ENVELOPE**2 * np.exp(-1j * (kx + ky) * centre)
+                * (np.exp(-ENVELOPE**2 * ((kx - k0)**2 + ky**2) / 2)
+                   + np.exp(-ENVELOPE**2 * ((kx + k0)**2 + ky**2) / 2)))
+    spectrum *= np.cos(c * np.sqrt(kx**2 + ky**2) * t)
+    field = np.real(np.fft.ifft2(spectrum)) / spacing**2
+    return field[:n * refine:refine, :n * refine:refine]
+
+
+def run(kernel, points):
+    # n cells spaced by dx span one period of the spectral grid
+    n = int(round(SIZE / WAVELENGTH * points))
+    dx = SIZE / n
+    tank = Tank(SIZE - dx, SIZE - dx, n, [], decay_factor=1.0, kernel=kernel, time_stepping="cfl")
+    tank.u[...] = initial_field(tank)
+    tank.u_prev[...] = exact_field(n, dx, tank.c, -tank.dt)
+    steps = int(round(PROPAGATION_TIME / tank.dt))
+    start = time.perf_counter()
+    tank.advance(steps)
+    elapsed = time.perf_counter() - start
+    exact = exact_field(n, dx, tank.c, steps * tank.dt)
+    error = np.linalg.norm(tank.u - exact) / np.linalg.norm(exact)
+    return n, error, 1e3 * elapsed / steps
+
+
+def main():
+    print(f"{'points/wavelength':>18}{'cells':>7}{'FD error':>12}{'FD ms':>9}"
+          f"{'spectral error':>16}{'spectral ms':>13}")
+    for points in POINTS_PER_WAVELENGTH:
+        n, fd_error, fd_time = run("inplace", points)
+        n, spectral_error, spectral_time = run("spectral", points)
+        print(f"{points:>18}{n:>7}{fd_error:>12.2e}{fd_time:>9.3f}{spectral_error:>16.2e}{spectral_time:>13.3f}")
+        sys.stdout.flush()
+
+
+if __name__ == '__main__':
+    main()
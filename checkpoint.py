@@ -0,0 +1,144 @@
+import json
+import os
+import struct
+import tempfile
+import zipfile
+
+import numpy as np
+
+from simulation import (Tank, Simulation, Slit, Obstacle, WAVE_PACKET_FIELDS,
+                        INTERFERENCE_POINT_FIELDS)
+
+# Checkpoints are uncompressed .npz files: the fields, the cached masks and the
+# source tables are stored as arrays and everything else as one JSON document
+# under 'state'. Uncompressed members are contiguous in the file, so
+# load_checkpoint can memory-map the fields instead of reading them.
+CHECKPOINT_VERSION = 1
+# Arrays that load_checkpoint memory-maps rather than reads
+MAPPED_ARRAYS = ("u", "u_prev")
+# Mappings the stepped fields can live in: copy-on-write, or writing through
+# to the file
+MMAP_MODES = ('c', 'r+')
+# Size of a zip local file header before its file name and extra field
+ZIP_LOCAL_HEADER = struct.Struct("<4s5H3L2H")
+
+
+def save_checkpoint(simulation, path):
+    tank = simulation.tank
+    state = {
+        'version': CHECKPOINT_VERSION,
+        'simulation': {'time': simulation.time, 'time_scale': simulation.time_scale,
+                       'pending_time': simulation._pending_time, 'steps': simulation.steps},
+        'tank': {'width': tank.width, 'height': tank.height, 'resolution': tank.resolution,
+                 'depth': tank.depth, 'decay_factor': tank.decay_factor, 'kernel': tank.kernel,
+                 'backend': tank.backend.name, 'time_stepping': tank.time_stepping,
+                 'courant': tank.courant, 'precision': tank.precision, 'dt': tank.dt,
+                 'boundary_type': tank.boundary_type,
+                 'standing_wave_mode': tank.standing_wave_mode},
+        'slits': [{'position': list(slit.position), 'width': slit.width, 'amplitude': slit.amplitude,
+                   'frequency': slit.frequency, 'wavelength': slit.wavelength,
+                   'direction': list(slit.direction)} for slit in tank.slits],
+        'obstacles': [{'position': list(obstacle.position), 'radius': obstacle.radius,
+                       'boundary_type': obstacle.boundary_type} for obstacle in tank.obstacles],
+    }
+    arrays = {'u': tank.u, 'u_prev': tank.u_prev, 'boundary': tank.boundary}
+    # Only stored once something has needed it
+    if tank._distance_map is not None:
+        arrays['distance_map'] = tank._distance_map
+    for prefix, store in (('packet_', tank.wave_packets), ('point_', tank.interference_points)):
+        for name in store.fields:
+            arrays[prefix + name] = store.column(name)
+    # The fields of a loaded checkpoint stay mapped onto its file, so
+    # overwriting it in place would pull the pages from under them. Write a
+    # new file next to it and move it over the old one instead.
+    path = os.fspath(path)
+    if not path.endswith('.npz'):
+        path += '.npz'
+    fd, temp_path = tempfile.mkstemp(suffix='.npz', dir=os.path.dirname(os.path.abspath(path)))
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            np.savez(f, state=np.array(json.dumps(state)), **arrays)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+def _mapped_member(path, archive, name, mmap_mode):
+    # Memory-map a stored (uncompressed) .npy member of a .npz archive
+    info = archive.getinfo(name + ".npy")
+    if info.compress_type != zipfile.ZIP_STORED:
+        return None
+    with open(path, "rb") as f:
+        f.seek(info.header_offset)
+        header = ZIP_LOCAL_HEADER.unpack(f.read(ZIP_LOCAL_HEADER.size))
+        f.seek(header[-2] + header[-1], 1)
+        version = np.lib.format.read_magic(f)
+        if version == (1, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+        else:
+            shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+        offset = f.tell()
+    return np.memmap(path, dtype=dtype, mode=mmap_mode, offset=offset, shape=shape,
+                     order='F' if fortran_order else 'C')
+
+
+def load_checkpoint(path, mmap_mode='c'):
+    # Restore a Simulation saved by save_checkpoint. With the default
+    # copy-on-write mapping the fields are paged in lazily and stepping never
+    # writes back to the file, so one checkpoint can seed many runs; pass
+    # mmap_mode=None to read the fields into memory instead.
+    if mmap_mode is not None and mmap_mode not in MMAP_MODES:
+        raise ValueError(f"Invalid mmap_mode {mmap_mode!r}: stepping writes to the fields. "
+                         "Choose 'c', 'r+' or None.")
+    with np.load(path) as data:
+        state = json.loads(str(data['state']))
+        if state['version'] != CHECKPOINT_VERSION:
+            raise ValueError(f"Unsupported checkpoint version {state['version']}.")
+        arrays = {name: data[name] for name in data.files if name != 'state'
+                  and (mmap_mode is None or name not in MAPPED_ARRAYS)}
+    if mmap_mode is not None:
+        with zipfile.ZipFile(path) as archive:
+            for name in MAPPED_ARRAYS:
+                mapped = _mapped_member(path, archive, name, mmap_mode)
+                if mapped is None:
+                    with np.load(path) as data:
+                        mapped = data[name]
+                arrays[name] = mapped
+
+    # The masks are restored from the file, so the tank is built without slits
+    # or obstacles and they are attached afterwards without recomputing them
+    options = state['tank']
+    tank = Tank(options['width'], options['height'], options['resolution'], [],
+                depth=options['depth'], decay_factor=options['decay_factor'], kernel=options['kernel'],
+                backend=options['backend'], time_stepping=options['time_stepping'],
+                courant=options['courant'], precision=options['precision'])
+    tank.set_dt(options['dt'])
+    tank.boundary_type = options['boundary_type']
+    tank.standing_wave_mode = options['standing_wave_mode']
+    for entry in state['slits']:
+        slit = Slit(tuple(entry['position']), entry['width'], entry['amplitude'],
+                    entry['frequency'], entry['wavelength'])
+        slit.direction = tuple(entry['direction'])
+        tank.slits.append(slit)
+    for entry in state['obstacles']:
+        obstacle = Obstacle(tuple(entry['position']), entry['radius'])
+        obstacle.boundary_type = entry['boundary_type']
+        tank.obstacles.append(obstacle)
+    tank.boundary[...] = arrays['boundary']
+    tank.distance_map = arrays.get('distance_map')
+    tank.update_damping()
+    tank.u = arrays['u']
+    tank.u_prev = arrays['u_prev']
+
+    for prefix, store, fields in (('packet_', tank.wave_packets, WAVE_PACKET_FIELDS),
+                                  ('point_', tank.interference_points, INTERFERENCE_POINT_FIELDS)):
+        for i in range(len(arrays[prefix + next(iter(fields))])):
+            store.append(**{name: arrays[prefix + name][i] for name in fields})
+
+    simulation = Simulation(tank)
+    simulation.time = state['simulation']['time']
+    simulation.time_scale = state['simulation']['time_scale']
+    simulation._pending_time = state['simulation']['pending_time']
+    simulation.steps = state['simulation']['steps']
+    return simulation
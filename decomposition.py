@@ -0,0 +1,161 @@
+import multiprocessing as mp
+import threading
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from backends import update_rows
+
+# Control block layout shared with the workers
+COMMAND, N_STEPS, PREV, CURRENT, NEXT, DX2, DY2, COEFF = range(8)
+RUN, EXIT = 0, 1
+# Seconds close() waits for each worker to exit before terminating it
+JOIN_TIMEOUT = 5
+
+
+def _attach(name, shape, dtype=np.float64):
+    block = shared_memory.SharedMemory(name=name)
+    return block, np.ndarray(shape, dtype=dtype, buffer=block.buf)
+
+
+def _worker(names, shape, dtype, r0, r1, barrier):
+    # Steps interior rows r0..r1-1 of the shared fields. The barrier at the end
+    # of each step publishes this strip's rows, which are the halo of the
+    # neighbouring strips for the next step. The coordinator aborts the
+    # barrier if it fails mid-run, which ends the worker.
+    blocks, arrays = zip(*(_attach(name, shape, dtype) for name in names['fields']))
+    damping_block, damping = _attach(names['damping'], (shape[0] - 2, shape[1] - 2), dtype)
+    control_block, control = _attach(names['control'], (8,))
+    twice = np.empty((shape[0] - 2, shape[1] - 2), dtype=dtype)
+    lap = np.empty((shape[0] - 2, shape[1] - 2), dtype=dtype)
+    try:
+        while True:
+            barrier.wait()
+            if control[COMMAND] == EXIT:
+                break
+            prev, current, nxt = (int(control[i]) for i in (PREV, CURRENT, NEXT))
+            dx2, dy2, coeff = (float(control[i]) for i in (DX2, DY2, COEFF))
+            for _ in range(int(control[N_STEPS])):
+                update_rows(arrays[current], arrays[prev], arrays[nxt], damping,
+                            twice, lap, dx2, dy2, coeff, r0, r1)
+                barrier.wait()  # interior done, coordinator finishes the step
+                barrier.wait()  # coordinator done, next step may start
+                prev, current, nxt = current, nxt, prev
+    except threading.BrokenBarrierError:
+        pass
+    finally:
+        del arrays, damping, control
+        for block in blocks + (damping_block, control_block):
+            block.close()
+
+
+class DecomposedStepper:
+    # Steps a Tank with one process per horizontal strip of the grid.
+    #
+    # The field buffers and the damping multiplier are moved into
+    # multiprocessing.shared_memory and the tank keeps working on views of
+    # them, so edges, sources and boundary handling still run in the tank
+    # (serially, in this process) and the result is bit-for-bit identical to
+    # serial stepping. Once attached, tank.advance() and Simulation.run_steps()
+    # use the workers; call close() (or use it as a context manager) to copy
+    # the fields back into private memory and release the workers.
+    def __init__(self, tank, n_workers=None):
+        if tank.kernel != "inplace":
+            raise ValueError("Domain decomposition requires the 'inplace' kernel.")
+        if n_workers is None:
+            n_workers = mp.cpu_count()
+        n = tank.resolution
+        n_workers = max(1, min(n_workers, n - 2))
+        self.tank = tank
+
+        self._blocks = []
+        self._fields = [self._share(array) for array in (tank.u_prev, tank.u, tank.u_next)]
+        tank.u_prev, tank.u, tank.u_next = self._fields
+        tank.damping = self._share(tank.damping)
+        self._control = self._share(np.zeros(8))
+
+        names = {'fields': [block.name for block in self._blocks[:3]],
+                 'damping': self._blocks[3].name, 'control': self._blocks[4].name}
+        bounds = np.linspace(1, n - 1, n_workers + 1).astype(int)
+        # Forking a process whose numba or OpenMP thread pool is running can
+        # hang it at exit, so the workers are spawned as in sweep.py
+        context = mp.get_context("spawn")
+        self._barrier = context.Barrier(n_workers + 1)
+        self._workers = [context.Process(target=_worker, args=(names, (n, n), tank.dtype, r0, r1, self._barrier),
+                                         daemon=True)
+                         for r0, r1 in zip(bounds[:-1], bounds[1:])]
+        for worker in self._workers:
+            worker.start()
+        tank.stepper = self
+
+    def _share(self, array):
+        block = shared_memory.SharedMemory(create=True, size=max(1, array.nbytes))
+        self._blocks.append(block)
+        shared = np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)
+        shared[...] = array
+        return shared
+
+    def advance(self, n_steps, t0=0.0, time_step=None):
+        tank = self.tank
+        if time_step is None:
+            time_step = tank.dt
+        sources = tank._prepare_sources()
+        control = self._control
+        control[COMMAND] = RUN
+        control[N_STEPS] = n_steps
+        control[PREV:NEXT + 1] = [self._index(a) for a in (tank.u_prev, tank.u, tank.u_next)]
+        control[DX2:COEFF + 1] = [tank.dx**2, tank.dy**2, tank.c**2 * tank.dt**2]
+
+        barrier = self._barrier
+        if barrier.broken:
+            raise RuntimeError("The DecomposedStepper workers were stopped by an earlier error; close it.")
+        time = t0
+        try:
+            barrier.wait()
+            for _ in range(n_steps):
+                time += time_step
+                barrier.wait()
+                tank._rotate()
+                tank._finish_step(time, sources)
+                barrier.wait()
+        except BaseException:
+            # Anything raised between the barriers (an error in a probe, Ctrl-C)
+            # would leave the workers waiting for this step forever
+            barrier.abort()
+            raise
+        return time
+
+    def _index(self, array):
+        for i, field in enumerate(self._fields):
+            if array is field:
+                return i
+        raise RuntimeError("Tank fields were replaced while a DecomposedStepper was attached.")
+
+    def close(self):
+        if self.tank.stepper is not self:
+            return
+        tank = self.tank
+        self._control[COMMAND] = EXIT
+        try:
+            self._barrier.wait(JOIN_TIMEOUT)
+        except threading.BrokenBarrierError:
+            pass
+        for worker in self._workers:
+            worker.join(JOIN_TIMEOUT)
+            if worker.is_alive():
+                worker.terminate()
+                worker.join()
+        tank.u_prev, tank.u, tank.u_next = (array.copy() for array in (tank.u_prev, tank.u, tank.u_next))
+        tank.damping = tank.damping.copy()
+        tank.stepper = None
+        del self._fields, self._control
+        for block in self._blocks:
+            block.close()
+            block.unlink()
+        self._blocks = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,272 @@
+import numpy as np
+
+# Edge width and ramp of the legacy "absorbing" boundary, as in Tank._finish_step
+ABSORBING_EDGE_WIDTH = 10
+# Target bytes per block of members in the stencil: the six full-grid arrays
+# it touches should fit in a typical L2 cache. Above N of about 150 (float64)
+# a block holds a single member, and members are stepped one after another.
+STENCIL_BLOCK_BYTES = 1 << 20
+
+
+class TankEnsemble:
+    # Steps K tanks that share a grid (width, height, resolution) and boundary
+    # type as one stacked (K, N, N) array.
+    #
+    # Members may differ in depth, decay, time step, obstacles and sources. The
+    # stack is stepped in blocks of members sized to stay in cache: each block
+    # runs all of its steps before the next one starts, which is legal because
+    # members never interact. Within a block the stencil runs once with
+    # per-member coefficients and the sources are injected with one scatter-add
+    # per source kind. That only saves Python overhead: on grids where a block
+    # is one member, the ensemble is as fast as separate tanks and serves as a
+    # container. Member tanks keep working on views of the stack (u,
+    # u_prev, u_next, damping), so their setters and fields stay live while they
+    # belong to the ensemble.
+    def __init__(self, tanks):
+        if not tanks:
+            raise ValueError("An ensemble needs at least one tank.")
+        first = tanks[0]
+        for tank in tanks:
+            if (tank.width, tank.height, tank.resolution) != (first.width, first.height, first.resolution):
+                raise ValueError("Ensemble members must share width, height and resolution.")
+            if tank.boundary_type != first.boundary_type:
+                raise ValueError("Ensemble members must share the boundary type.")
+            if tank.dtype != first.dtype:
+                raise ValueError("Ensemble members must share the precision.")
+            if tank.kernel != "inplace" or tank.stepper is not None:
+                raise ValueError("Ensemble members must use the 'inplace' kernel without a stepper.")
+        self.tanks = list(tanks)
+        n = first.resolution
+
+        self.u_prev = np.stack([tank.u_prev for tank in tanks])
+        self.u = np.stack([tank.u for tank in tanks])
+        self.u_next = np.stack([tank.u_next for tank in tanks])
+        self.damping = np.stack([tank.damping for tank in tanks])
+        self._twice = np.empty((len(tanks), n - 2, n - 2), dtype=first.dtype)
+        self._lap = np.empty((len(tanks), n - 2, n - 2), dtype=first.dtype)
+        for k, tank in enumerate(tanks):
+            tank.damping = self.damping[k]
+        per_block = max(1, STENCIL_BLOCK_BYTES // (6 * n * n * first.dtype.itemsize))
+        self._blocks = [slice(k, k + per_block) for k in range(0, len(tanks), per_block)]
+        self._bind_members()
+
+    def __len__(self):
+        return len(self.tanks)
+
+    def _bind_members(self):
+        for k, tank in enumerate(self.tanks):
+            tank.u_prev, tank.u, tank.u_next = self.u_prev[k], self.u[k], self.u_next[k]
+
+    def member_parameters(self, name):
+        # Per-member parameter vector, e.g. member_parameters('c')
+        return np.array([getattr(tank, name) for tank in self.tanks], dtype=float)
+
+    def advance(self, n_steps, t0=0.0, time_step=None):
+        # Like Tank.advance, with t0 and time_step as scalars or per-member
+        # arrays (time_step defaults to each member's dt). Returns the
+        # per-member source times after the last step.
+        k = len(self.tanks)
+        dt = self.member_parameters('dt')
+        if time_step is None:
+            time_step = dt
+        times = np.array(np.broadcast_to(np.asarray(t0, dtype=float), (k,)))
+        time_step = np.broadcast_to(np.asarray(time_step, dtype=float), (k,))
+
+        first = self.tanks[0]
+        dx2, dy2 = first.dx**2, first.dy**2
+        coeff = (self.member_parameters('c')**2 * dt**2).astype(first.dtype)
+        mur = None
+        if first.boundary_type == "mur":
+            c_dt = self.member_parameters('c') * dt
+            mur = (((c_dt - first.dx) / (c_dt + first.dx))[:, None],
+                   ((c_dt - first.dy) / (c_dt + first.dy))[:, None])
+        for block in self._blocks:
+            block_mur = None if mur is None else (mur[0][block], mur[1][block])
+            self._advance_block(block, n_steps, times[block], time_step[block],
+                                (dx2, dy2, coeff[block, None, None]), block_mur)
+
+        # Every block has cycled its three buffers n_steps times
+        for _ in range(n_steps % 3):
+            self.u_prev, self.u, self.u_next = self.u, self.u_next, self.u_prev
+        self._bind_members()
+        return times
+
+    def _advance_block(self, block, n_steps, times, time_step, stencil, mur):
+        # All n_steps of one block of members, updating times in place
+        tanks = self.tanks[block]
+        fields = self.u_prev[block], self.u[block], self.u_next[block]
+        scratch = self.damping[block], self._twice[block], self._lap[block]
+        sources = self._prepare_sources(tanks)
+        absorbing = tanks[0].boundary_type == "absorbing"
+        if len(tanks) == 1:
+            # Plain 2-D views with a scalar coefficient
+            fields = tuple(field[0] for field in fields)
+            scratch = tuple(array[0] for array in scratch)
+            stencil = stencil[:2] + (stencil[2][0, 0, 0],)
+
+        for _ in range(n_steps):
+            times += time_step
+            u_prev, u, u_next = fields
+            self._update_field(fields, scratch, *stencil)
+            self._apply_edges(u, u_next, mur)
+            fields = u, u_next, u_prev
+            u = u_next.reshape((-1,) + u_next.shape[-2:])
+            self._inject_sources(u, times, sources)
+            if absorbing:
+                self._absorb_edges(u)
+            for k, tank in enumerate(tanks):
+                for probe in tank.probes:
+                    probe.sample(u[k], times[k])
+
+    def _update_field(self, fields, scratch, dx2, dy2, coeff):
+        # Same arithmetic as backends.update_rows, for one block of members
+        u_prev, u, u_next = fields
+        damping, twice, lap = scratch
+        inner = u_next[..., 1:-1, 1:-1]
+
+        np.multiply(u[..., 1:-1, 1:-1], 2, out=twice)
+        np.add(u[..., 1:-1, 2:], u[..., 1:-1, :-2], out=lap)
+        lap -= twice
+        lap /= dx2
+        np.add(u[..., 2:, 1:-1], u[..., :-2, 1:-1], out=inner)
+        inner -= twice
+        inner /= dy2
+        lap += inner
+        lap *= coeff
+
+        np.subtract(twice, u_prev[..., 1:-1, 1:-1], out=inner)
+        inner += lap
+        inner *= damping
+
+    def _apply_edges(self, u, u_next, mur):
+        # Edges of the new field, on (K, N, N) or single (N, N) views
+        u = u.reshape((-1,) + u.shape[-2:])
+        u_next = u_next.reshape(u.shape)
+        if mur is None:
+            u_next[:, 0, :] = u[:, 0, :]
+            u_next[:, -1, :] = u[:, -1, :]
+            u_next[:, 1:-1, 0] = u[:, 1:-1, 0]
+            u_next[:, 1:-1, -1] = u[:, 1:-1, -1]
+        else:
+            kx, ky = mur
+            inner = slice(1, -1)
+            for edge, neighbour, k in (((0, inner), (1, inner), ky), ((-1, inner), (-2, inner), ky),
+                                       ((inner, 0), (inner, 1), kx), ((inner, -1), (inner, -2), kx)):
+                edge, neighbour = (slice(None),) + edge, (slice(None),) + neighbour
+                out = u_next[edge]
+                np.subtract(u_next[neighbour], u[edge], out=out)
+                out *= k
+                out += u[neighbour]
+            for row, col, row_in, col_in in ((0, 0, 1, 1), (0, -1, 1, -2), (-1, 0, -2, 1), (-1, -1, -2, -2)):
+                u_next[:, row, col] = 0.5 * (u_next[:, row_in, col] + u_next[:, row, col_in])
+
+    def _absorb_edges(self, u):
+        edge_factor = np.linspace(0, 1, ABSORBING_EDGE_WIDTH)[:, np.newaxis]
+        u[:, :ABSORBING_EDGE_WIDTH, :] *= edge_factor
+        u[:, -ABSORBING_EDGE_WIDTH:, :] *= edge_factor[::-1]
+        u[:, :, :ABSORBING_EDGE_WIDTH] *= edge_factor.T
+        u[:, :, -ABSORBING_EDGE_WIDTH:] *= edge_factor[::-1].T
+
+    def _prepare_sources(self, tanks):
+        # Concatenate the compiled source operators of a block of members into
+        # block-wide operators, offsetting flat indices by each member's grid
+        cells = tanks[0].resolution**2
+        gains = np.array([tank.source_gain for tank in tanks], dtype=float)
+        slits, packets, points, standing = [], [], [], []
+        packet_count = 0
+        for k, tank in enumerate(tanks):
+            slit_sources, packet_sources, point_sources, standing_wave, cell_gains = tank._prepare_sources()
+            if cell_gains is None:
+                cell_gains = (None, None, None)
+
+            def gain_of(sources, which):
+                if cell_gains[which] is None:
+                    return np.ones(sources[0].size)
+                return cell_gains[which]
+
+            if slit_sources is not None:
+                index, amplitude, frequency, phase, _ = slit_sources
+                slits.append((index + k * cells, amplitude, frequency, phase, np.full(index.size, k),
+                              gain_of(slit_sources, 0)))
+            if packet_sources is not None:
+                index, owner, cos_part, sin_part, omega = packet_sources[:5]
+                packets.append((index + k * cells, owner + packet_count, cos_part, sin_part,
+                                omega, np.full(omega.size, k), gain_of(packet_sources, 1)))
+                packet_count += omega.size
+            if point_sources is not None:
+                index, amplitude, omega, _ = point_sources
+                points.append((index + k * cells, amplitude, omega, np.full(index.size, k),
+                               gain_of(point_sources, 2)))
+            standing.append(None if standing_wave is None else standing_wave[0])
+
+        def concat(parts):
+            if not parts:
+                return None
+            arrays = [np.concatenate(column) for column in zip(*parts)]
+            index = arrays[0]
+            return arrays + [np.empty(index.size), np.empty(index.size)]
+
+        standing_profiles = None
+        if any(profile is not None for profile in standing):
+            n = tanks[0].resolution
+            standing_profiles = np.stack([np.zeros(n) if profile is None else profile for profile in standing])
+        return concat(slits), concat(packets), concat(points), standing_profiles, gains
+
+    def _inject_sources(self, field, times, sources):
+        # Same arithmetic as Tank._inject_sources, for a (K, N, N) block of
+        # members at once
+        slit_sources, packet_sources, point_sources, standing_profiles, gains = sources
+        u = field.reshape(-1)
+        scaled = np.any(gains != 1)
+        scatter_add = self.tanks[0].backend.scatter_add
+
+        # Generate new waves at slits
+        if slit_sources is not None:
+            index, amplitude, frequency, phase, member, cell_gain, wave, _ = slit_sources
+            np.take(times, member, out=wave)
+            wave *= frequency
+            wave -= phase
+            wave *= 2 * np.pi
+            np.sin(wave, out=wave)
+            wave *= amplitude
+            if scaled:
+                wave *= cell_gain
+            scatter_add(u, index, wave)
+
+        # Generate wave packets
+        if packet_sources is not None:
+            index, owner, cos_part, sin_part, omega, packet_member, cell_gain, wave, scratch = packet_sources
+            phase_t = omega * times[packet_member]
+            np.take(np.sin(phase_t), owner, out=wave)
+            wave *= cos_part
+            np.take(np.cos(phase_t), owner, out=scratch)
+            scratch *= sin_part
+            wave -= scratch
+            if scaled:
+                wave *= cell_gain
+            scatter_add(u, index, wave)
+
+        # Generate interference points
+        if point_sources is not None:
+            index, amplitude, omega, member, cell_gain, wave, _ = point_sources
+            np.take(times, member, out=wave)
+            wave *= omega
+            np.sin(wave, out=wave)
+            wave *= amplitude
+            if scaled:
+                wave *= cell_gain
+            scatter_add(u, index, wave)
+
+        # Generate standing waves
+        if standing_profiles is not None:
+            rows = standing_profiles * np.sin(2 * np.pi * times)[:, None]
+            if not scaled:
+                field += rows[:, None, :]
+            else:
+                interior = rows * gains[:, None]
+                edge = rows * np.sqrt(gains)[:, None]
+                field[:, 1:-1, 1:-1] += interior[:, None, 1:-1]
+                field[:, 0, :] += edge
+                field[:, -1, :] += edge
+                field[:, 1:-1, 0] += edge[:, :1]
+                field[:, 1:-1, -1] += edge[:, -1:]
@@ -0,0 +1,156 @@
+import numpy as np
+
+# Frequency-domain steady state of a tank's slits.
+#
+# Slits driven at one frequency f settle to u(t) = Re(U exp(-i w t)) with
+# w = 2 pi f. The finite-difference kernels step
+#
+#     u(t + dt) = d (2 u(t) - u(t - dt) + c**2 dt**2 laplacian(u(t))) + s(t + dt)
+#
+# with d the tank's per-cell damping and s the slit sources, so with
+# s(t) = Re(S exp(-i w t)) HelmholtzSolver computes U directly from
+#
+#     c**2 dt**2 laplacian(U) - (exp(-i w dt) / d + exp(i w dt) - 2) U
+#         = -exp(-i w dt) S / d
+#
+# on the tank grid. Obstacle cells hold U = 0. A perfectly matched layer pads
+# the grid on every side, so waves leave the tank as through "mur" edges.
+# Since d scales the field once per step, the result depends on dt (see
+# Tank.set_dt).
+#
+# The sparse LU factorisation of the operator depends only on the grid, the
+# obstacles, the damping and the frequency. It is cached, so that new slit
+# amplitudes, phases or wavelengths only cost a back-substitution. Requires
+# scipy.
+
+PML_WIDTH = 20  # cells beyond each edge of the tank
+# Normal-incidence reflection the layer is graded for
+PML_REFLECTION = 1e-6
+
+
+class HelmholtzSolver:
+    def __init__(self, tank, pml_width=PML_WIDTH):
+        try:
+            import scipy.sparse  # noqa: F401
+        except ImportError:
+            raise ImportError("The Helmholtz solver requires the scipy package.") from None
+        if pml_width < 1:
+            raise ValueError("pml_width must be a positive number of cells.")
+        self.tank = tank
+        self.pml_width = pml_width
+        self._geometry_key = None
+        self._factors = {}
+
+    def frequencies(self):
+        return sorted({slit.frequency for slit in self.tank.slits})
+
+    def solve(self, frequency=None, amplitudes=None, phases=None):
+        # Complex amplitude U of the steady state driven by the slits of one
+        # frequency (by default the frequency all slits share). amplitudes and
+        # phases (in radians), given per slit of tank.slits, replace the slit
+        # amplitudes and shift the slit phases.
+        if frequency is None:
+            frequencies = self.frequencies()
+            if len(frequencies) != 1:
+                raise ValueError("The slits do not share one frequency; pass the frequency to solve.")
+            frequency = frequencies[0]
+        n, p = self.tank.resolution, self.pml_width
+        field = self._factorization(frequency).solve(self._forcing(frequency, amplitudes, phases))
+        return field.reshape(n + 2 * p, n + 2 * p)[p:p + n, p:p + n].copy()
+
+    def intensity(self, frequency=None, amplitudes=None, phases=None):
+        # Time average of u**2. Without a frequency the intensities of all slit
+        # frequencies are summed, as their cross terms average out.
+        frequencies = self.frequencies() if frequency is None else [frequency]
+        intensity = np.zeros((self.tank.resolution, self.tank.resolution))
+        for frequency in frequencies:
+            field = self.solve(frequency, amplitudes, phases)
+            intensity += 0.5 * (field.real**2 + field.imag**2)
+        return intensity
+
+    def _factorization(self, frequency):
+        from scipy.sparse.linalg import splu
+
+        tank = self.tank
+        key = (tank.resolution, tank.dx, tank.dy, tank.c, tank.dt, tank.decay_factor,
+               tank.boundary.tobytes(), tuple(slit.position for slit in tank.slits))
+        if key != self._geometry_key:
+            self._geometry_key = key
+            self._factors = {}
+        if frequency not in self._factors:
+            self._factors[frequency] = splu(self._operator(frequency))
+        return self._factors[frequency]
+
+    def _operator(self, frequency):
+        import scipy.sparse as sparse
+
+        tank = self.tank
+        n, p = tank.resolution, self.pml_width
+        size = n + 2 * p
+        omega = 2 * np.pi * frequency
+        identity = sparse.identity(size, format='csr')
+        # Cells are numbered row-major, so x runs along the inner index
+        operator = (sparse.kron(identity, self._second_difference(size, tank.dx, omega))
+                    + sparse.kron(self._second_difference(size, tank.dy, omega), identity))
+
+        # The discrete time derivative, divided by c**2 dt**2; the layer is undamped
+        damping = np.ones((size, size))
+        damping[p:p + n, p:p + n] = self._damping()
+        shift = np.exp(1j * omega * tank.dt)
+        diagonal = (2 - shift - 1 / (shift * damping)) / (tank.c * tank.dt)**2
+        operator = operator + sparse.diags(diagonal.ravel())
+
+        # Obstacle rows become U = 0; the tank walls are replaced by the layer
+        blocked = np.zeros((size, size), dtype=bool)
+        blocked[p + 1:p + n - 1, p + 1:p + n - 1] = ~tank.boundary[1:-1, 1:-1]
+        blocked = blocked.ravel().astype(float)
+        return (sparse.diags(1 - blocked) @ operator + sparse.diags(blocked)).tocsc()
+
+    def _second_difference(self, size, spacing, omega):
+        # (1/s) d/dx (1/s) d/dx along one axis of the padded grid, with the
+        # coordinate stretch s = 1 + i sigma / w growing quadratically into the
+        # layer and U = 0 beyond its outer cells
+        import scipy.sparse as sparse
+
+        p = self.pml_width
+        sigma_max = 3 * self.tank.c * np.log(1 / PML_REFLECTION) / (2 * p * spacing)
+
+        def stretch(position):
+            depth = np.maximum(np.maximum(p - position, position - (size - 1 - p)), 0) / p
+            return 1 + 1j * sigma_max * depth**2 / omega
+
+        nodes = stretch(np.arange(size))
+        faces = stretch(np.arange(size + 1) - 0.5)
+        main = -(1 / faces[:-1] + 1 / faces[1:]) / (nodes * spacing**2)
+        lower = 1 / (faces[1:-1] * nodes[1:] * spacing**2)
+        upper = 1 / (faces[1:-1] * nodes[:-1] * spacing**2)
+        return sparse.diags([lower, main, upper], [-1, 0, 1], format='csr')
+
+    def _damping(self):
+        return self.tank.step_decay().astype(float)
+
+    def _forcing(self, frequency, amplitudes, phases):
+        # Each step the kernels add A sin(w t - 2 pi x / wavelength) times the
+        # source gain (dt / dt_fixed)**2 to the slit cells (see Tank.set_dt).
+        # Edge cells are not stepped, so only the slit cells inside them drive
+        # the field. sin(w t - phi) = Re(i exp(i phi) exp(-i w t)).
+        tank = self.tank
+        n, p = tank.resolution, self.pml_width
+        fixed_dt = tank.fixed_dt()
+        forcing = np.zeros((n + 2 * p, n + 2 * p), dtype=complex)
+        inside = forcing[p + 1:p + n - 1, p + 1:p + n - 1]
+        for k, slit in enumerate(tank.slits):
+            cells = tank.slit_cells(slit)
+            if cells is None or slit.frequency != frequency:
+                continue
+            # The slit cells clipped to the interior, as slices of `inside`
+            rows, cols = (slice(max(axis.start, 1) - 1, min(axis.stop, n - 1) - 1) for axis in cells)
+            amplitude = slit.amplitude if amplitudes is None else amplitudes[k]
+            phase = 2 * np.pi * tank.x[1:-1][cols] / slit.wavelength
+            if phases is not None:
+                phase = phase + phases[k]
+            inside[rows, cols] += 1j * amplitude * np.exp(1j * phase)
+        # The right-hand side over c**2 dt**2, where the gain cancels the dt**2
+        forcing[p:p + n, p:p + n] /= self._damping()
+        forcing *= -np.exp(-2j * np.pi * frequency * tank.dt) / (fixed_dt * tank.c)**2
+        return forcing.ravel()
@@ -0,0 +1,98 @@
+import argparse
+import json
+import sys
+import time
+
+import numpy as np
+
+from simulation import load_scene
+
+# Headless command-line runner. Only numpy and simulation.py are imported, so
+# it starts quickly on machines without a display or the Qt/matplotlib stack:
+#
+#     python -m interference run scene.json --steps 5000 --out result.npz
+#     python -m interference sweep grid.json --steps 2000 --manifest sweep.jsonl
+
+
+def run(args):
+    start = time.perf_counter()
+    simulation = load_scene(args.scene)
+    if args.backend is not None:
+        simulation.tank.set_backend(args.backend)
+    setup_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    if args.steps is not None:
+        simulation.run_steps(args.steps)
+    if args.duration is not None:
+        simulation.step(args.duration)
+    run_time = time.perf_counter() - start
+
+    tank = simulation.tank
+    np.savez(args.out, u=tank.u, x=tank.x, y=tank.y, time=simulation.time, dt=tank.dt)
+    if not args.quiet:
+        print(f"Ran {args.scene} to t={simulation.time:.4f} in {run_time:.3f}s "
+              f"(setup {setup_time:.3f}s), wrote {args.out}")
+
+
+def sweep(args):
+    # Imported here so that "run" does not pay for the process-pool machinery
+    from sweep import run_sweep
+
+    with open(args.grid) as f:
+        grid = json.load(f)
+
+    def progress(done, total):
+        if not args.quiet:
+            print(f"{done}/{total} runs complete", flush=True)
+
+    start = time.perf_counter()
+    records = run_sweep(grid, steps=args.steps, duration=args.duration, manifest=args.manifest,
+                        max_workers=args.workers, threads_per_worker=args.threads, progress=progress)
+    with open(args.out, "w") as f:
+        json.dump(records, f)
+    failed = sum('error' in record for record in records)
+    if not args.quiet:
+        print(f"Swept {len(records)} configurations in {time.perf_counter() - start:.1f}s, wrote {args.out}")
+        if failed:
+            print(f"{failed} runs failed; rerun with the same --manifest to retry them")
+    if failed:
+        sys.exit(1)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="interference", description="Headless wave interference runner")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="run a scene file and save the final field")
+    run_parser.add_argument("scene", help="scene description (JSON)")
+    run_parser.add_argument("--steps", type=int, help="number of physical time steps to run")
+    run_parser.add_argument("--duration", type=float, help="simulated time to run, as Simulation.step(duration)")
+    run_parser.add_argument("--out", default="result.npz", help="output .npz file (default: result.npz)")
+    run_parser.add_argument("--backend", help="compute backend (numpy, numba, threaded)")
+    run_parser.add_argument("--quiet", action="store_true", help="do not print a summary")
+    run_parser.set_defaults(func=run)
+
+    sweep_parser = commands.add_parser("sweep", help="run a parameter sweep over a process pool")
+    sweep_parser.add_argument("grid", help="JSON mapping of parameter names to lists of values")
+    sweep_parser.add_argument("--steps", type=int, help="number of physical time steps per run")
+    sweep_parser.add_argument("--duration", type=float, help="simulated time per run")
+    sweep_parser.add_argument("--manifest", help="JSON-lines file of finished runs, used to resume")
+    sweep_parser.add_argument("--workers", type=int, help="worker processes (default: CPU count)")
+    sweep_parser.add_argument("--threads", type=int, default=1, help="NumPy threads per worker (default: 1)")
+    sweep_parser.add_argument("--out", default="sweep.json", help="output JSON file (default: sweep.json)")
+    sweep_parser.add_argument("--quiet", action="store_true", help="do not print progress")
+    sweep_parser.set_defaults(func=sweep)
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.steps is None and args.duration is None:
+        parser.error(f"{args.command} needs --steps or --duration")
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
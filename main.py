@@ -1,22 +1,90 @@
 import sys
+import threading
+import time
 import numpy as np
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QVBoxLayout, QHBoxLayout,
-                             QWidget, QPushButton, QSlider, QLabel, QScrollArea, QCheckBox,
-                             QComboBox)
-from PyQt5.QtCore import Qt
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
-from matplotlib.figure import Figure
-
-from simulation import Slit, Obstacle, Tank, Simulation
-
+                             QWidget, QPushButton, QSlider, QLabel, QScrollArea, QComboBox)
+from PyQt5.QtCore import Qt, QThread, QTimer
+
+from renderers import DisplayView, get_renderer
+from simulation import Obstacle, create_simulation
+
+RENDER_INTERVAL_MS = 16  # about 60 fps
+# The worker advances the simulation by SIMULATION_RATE simulated seconds per
+# second of wall-clock time (or as fast as it can when a tick takes longer), as
+# the original 50 ms timer did. It ticks, and publishes a frame, once per render
+# interval, so every redraw can show a new frame.
+SIMULATION_RATE = 1.0
+TICK_INTERVAL = RENDER_INTERVAL_MS / 1000
+SIMULATION_TICK = SIMULATION_RATE * TICK_INTERVAL
+RATE_INTERVAL_MS = 1000
+
+
+class LatestFrameBuffer:
+    # Single-slot frame buffer between the worker and the GUI. Publishing
+    # replaces a frame that has not been taken yet, so the display always
+    # shows the newest state and stale frames are dropped instead of queued.
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._frame = None
+        self.dropped = 0
+
+    def publish(self, frame, sim_time):
+        with self._lock:
+            if self._frame is not None:
+                self.dropped += 1
+            self._frame = (frame, sim_time)
+
+    def take(self):
+        with self._lock:
+            frame, self._frame = self._frame, None
+        return frame
+
+
+class SimulationWorker(QThread):
+    # Steps the simulation off the GUI thread and publishes a copy of the field
+    # after every tick. GUI code that changes the simulation must hold `lock`.
+    def __init__(self, simulation, frames, view):
+        super().__init__()
+        self.simulation = simulation
+        self.frames = frames
+        self.view = view
+        self.lock = threading.Lock()
+        self.running = False
+        self._stopping = False
+
+    def run(self):
+        while not self._stopping:
+            start = time.perf_counter()
+            if self.running:
+                with self.lock:
+                    self.simulation.step(SIMULATION_TICK)
+                    self.publish()
+            time.sleep(max(0.0, TICK_INTERVAL - (time.perf_counter() - start)))
+
+    def publish(self):
+        # Callers other than run() must hold the lock. Only the visible region,
+        # decimated to the display size, is copied out of the field.
+        self.frames.publish(self.view.extract(self.simulation.tank.u), self.simulation.time)
+
+    def stop(self):
+        self._stopping = True
+        self.wait()
 
 
 class SimulationGUI(QMainWindow):
-    def __init__(self, simulation):
+    def __init__(self, simulation, renderer=None):
         super().__init__()
         self.simulation = simulation
+        self.renderer_name = renderer
         self.is_running = False
+        self.frames = LatestFrameBuffer()
+        self.view = DisplayView(simulation.tank)
+        self.worker = SimulationWorker(simulation, self.frames, self.view)
+        self.frames_rendered = 0
+        self._rate_mark = (time.perf_counter(), simulation.steps, 0)
         self.initUI()
+        self.worker.start()
 
     def initUI(self):
         self.setWindowTitle('Wave Interference Simulation')
@@ -26,11 +94,13 @@ class SimulationGUI(QMainWindow):
         self.setCentralWidget(central_widget)
         main_layout = QHBoxLayout(central_widget)
 
-        # Left side: Matplotlib figure
+        # Left side: field view
         figure_layout = QVBoxLayout()
-        self.figure = Figure(figsize=(5, 5))
-        self.canvas = FigureCanvas(self.figure)
-        figure_layout.addWidget(self.canvas)
+        self.renderer = get_renderer(self.renderer_name, self.simulation.tank)
+        figure_layout.addWidget(self.renderer.widget)
+        self.renderer.connect_click(self.centre_view)
+        self.rate_label = QLabel('Simulation: 0 steps/s (0.00x real time) | Display: 0 fps')
+        figure_layout.addWidget(self.rate_label)
         main_layout.addLayout(figure_layout, 2)
 
         # Right side: Controls
@@ -59,7 +129,9 @@ class SimulationGUI(QMainWindow):
 
         # Boundary type selection
         self.boundary_combo = QComboBox()
-        self.boundary_combo.addItems(["Reflective", "Absorbing", "Open"])
+        tank = self.simulation.tank
+        self.boundary_combo.addItems([name.capitalize() for name in tank.boundary_types()])
+        self.boundary_combo.setCurrentText(tank.boundary_type.capitalize())
         self.boundary_combo.currentTextChanged.connect(self.change_boundary_type)
         controls_layout.addWidget(QLabel("Boundary Type:"))
         controls_layout.addWidget(self.boundary_combo)
@@ -71,6 +143,13 @@ class SimulationGUI(QMainWindow):
         controls_layout.addWidget(QLabel("Standing Wave Mode:"))
         controls_layout.addWidget(self.standing_wave_combo)
 
+        # Display zoom; clicking the field view re-centres the zoomed region
+        self.zoom_combo = QComboBox()
+        self.zoom_combo.addItems(["1x", "2x", "4x", "8x", "16x"])
+        self.zoom_combo.currentTextChanged.connect(self.change_zoom)
+        controls_layout.addWidget(QLabel("Display Zoom:"))
+        controls_layout.addWidget(self.zoom_combo)
+
         # Slit controls
         controls_layout.addWidget(QLabel('Slit Controls'))
         self.slit_controls = []
@@ -116,13 +195,18 @@ class SimulationGUI(QMainWindow):
 
         controls_layout.addLayout(button_layout)
 
-        self.ax = self.figure.add_subplot(111)
-        self.im = self.simulation.tank.plot(self.ax)
-        self.ax.set_title('Wave Interference Simulation')
-        self.ax.set_xlabel('X')
-        self.ax.set_ylabel('Y')
-        self.timer = self.canvas.new_timer(interval=50)
-        self.timer.add_callback(self.update_plot)
+        # The analytic kernel only evaluates the slit waves
+        if self.simulation.tank.kernel == "analytic":
+            for widget in (self.standing_wave_combo, self.add_obstacle_button,
+                           self.add_wave_packet_button, self.add_interference_point_button):
+                widget.setEnabled(False)
+
+        self.render_timer = QTimer(self)
+        self.render_timer.timeout.connect(self.render_frame)
+        self.render_timer.start(RENDER_INTERVAL_MS)
+        self.rate_timer = QTimer(self)
+        self.rate_timer.timeout.connect(self.update_rates)
+        self.rate_timer.start(RATE_INTERVAL_MS)
 
     def create_slider(self, name, min_val, max_val, default_val, callback):
         slider_layout = QVBoxLayout()
@@ -137,67 +221,91 @@ class SimulationGUI(QMainWindow):
         return container
 
     def update_time_scale(self, value):
-        self.simulation.set_time_scale(value / 100)
+        with self.worker.lock:
+            self.simulation.set_time_scale(value / 100)
 
     def update_depth(self, value):
         depth = value / 10
-        self.simulation.tank.set_depth(depth)
+        with self.worker.lock:
+            self.simulation.tank.set_depth(depth)
         print(f"Updated tank depth to {depth}")
 
     def update_decay_factor(self, value):
         decay_factor = value / 1000
-        self.simulation.tank.set_decay_factor(decay_factor)
+        with self.worker.lock:
+            self.simulation.tank.set_decay_factor(decay_factor)
         print(f"Updated wave decay factor to {decay_factor}")
 
     def change_boundary_type(self, boundary_type):
-        self.simulation.tank.set_boundary_type(boundary_type.lower())
+        with self.worker.lock:
+            self.simulation.tank.set_boundary_type(boundary_type.lower())
+            self.worker.publish()
         print(f"Changed boundary type to {boundary_type}")
-        self.update_plot()
 
     def change_standing_wave_mode(self, mode):
-        if mode == "None":
-            self.simulation.tank.set_standing_wave_mode(None)
-        else:
-            self.simulation.tank.set_standing_wave_mode(int(mode))
+        with self.worker.lock:
+            if mode == "None":
+                self.simulation.tank.set_standing_wave_mode(None)
+            else:
+                self.simulation.tank.set_standing_wave_mode(int(mode))
         print(f"Changed standing wave mode to {mode}")
 
+    def change_zoom(self, zoom):
+        self.view.zoom(int(zoom[:-1]))
+        self.publish_frame()
+
+    def centre_view(self, x, y):
+        if self.view.region is not None:
+            self.view.zoom(int(self.zoom_combo.currentText()[:-1]), (x, y))
+            self.publish_frame()
+
+    def publish_frame(self):
+        with self.worker.lock:
+            self.worker.publish()
+
     def update_slit_amplitude(self, slit, value):
-        slit.amplitude = value / 10
+        with self.worker.lock:
+            slit.amplitude = value / 10
         print(f"Updated slit amplitude to {slit.amplitude}")
 
     def update_slit_wavelength(self, slit, value):
-        slit.wavelength = value / 10
+        with self.worker.lock:
+            slit.wavelength = value / 10
         print(f"Updated slit wavelength to {slit.wavelength}")
 
     def update_slit_frequency(self, slit, value):
-        slit.frequency = value / 100
+        with self.worker.lock:
+            slit.frequency = value / 100
         print(f"Updated slit frequency to {slit.frequency}")
 
     def update_slit_width(self, slit, value):
-        slit.width = value / 100
+        with self.worker.lock:
+            slit.width = value / 100
         print(f"Updated slit width to {slit.width}")
 
     def toggle_simulation(self):
         if self.is_running:
-            self.timer.stop()
+            self.worker.running = False
             self.start_stop_button.setText('Start')
             self.is_running = False
         else:
-            self.timer.start()
+            self.worker.running = True
             self.start_stop_button.setText('Stop')
             self.is_running = True
 
     def reset_simulation(self):
-        self.simulation.reset()
-        self.update_plot()
+        with self.worker.lock:
+            self.simulation.reset()
+            self.worker.publish()
 
     def add_obstacle(self):
         x = np.random.uniform(0, self.simulation.tank.width)
         y = np.random.uniform(0, self.simulation.tank.height)
         radius = np.random.uniform(0.5, 2)
         obstacle = Obstacle((x, y), radius)
-        self.simulation.tank.add_obstacle(obstacle)
-        self.update_plot()
+        with self.worker.lock:
+            self.simulation.tank.add_obstacle(obstacle)
+            self.worker.publish()
         print(f"Added obstacle at ({x:.2f}, {y:.2f}) with radius {radius:.2f}")
 
     def add_wave_packet(self):
@@ -208,7 +316,8 @@ class SimulationGUI(QMainWindow):
         wavelength = np.random.uniform(1, 5)
         width = np.random.uniform(1, 3)
         direction = (np.random.uniform(-1, 1), np.random.uniform(-1, 1))
-        self.simulation.tank.add_wave_packet((x, y), amplitude, frequency, wavelength, width, direction)
+        with self.worker.lock:
+            self.simulation.tank.add_wave_packet((x, y), amplitude, frequency, wavelength, width, direction)
         print(f"Added wave packet at ({x:.2f}, {y:.2f})")
 
     def add_interference_point(self):
@@ -216,40 +325,36 @@ class SimulationGUI(QMainWindow):
         y = np.random.uniform(0, self.simulation.tank.height)
         amplitude = np.random.uniform(0.5, 2)
         frequency = np.random.uniform(0.5, 2)
-        self.simulation.tank.add_interference_point((x, y), amplitude, frequency)
+        with self.worker.lock:
+            self.simulation.tank.add_interference_point((x, y), amplitude, frequency)
         print(f"Added interference point at ({x:.2f}, {y:.2f})")
 
-    def update_plot(self):
-        self.simulation.step(0.05)
-        self.im.set_array(self.simulation.tank.u)
-        self.im.set_clim(vmin=-1, vmax=1)  # Fixed color scaling
-        self.canvas.draw()
-
-def create_simulation(slit_config, depth=1.0, decay_factor=0.999):
-    width, height = 20, 20
-    resolution = 200
-    slits = []
-
-    for side, num_slits in slit_config.items():
-        for i in range(num_slits):
-            if side == 'bottom':
-                x = width * (i + 1) / (num_slits + 1)
-                y = 0
-            elif side == 'top':
-                x = width * (i + 1) / (num_slits + 1)
-                y = height
-            elif side == 'left':
-                x = 0
-                y = height * (i + 1) / (num_slits + 1)
-            elif side == 'right':
-                x = width
-                y = height * (i + 1) / (num_slits + 1)
-
-            slits.append(Slit((x, y), width=0.5, amplitude=10, frequency=1, wavelength=2))
-
-    tank = Tank(width, height, resolution, slits, depth=depth, decay_factor=decay_factor)
-    tank.set_boundary_type("reflective")  # Set default boundary type
-    return Simulation(tank)
+    def render_frame(self):
+        # Draw the newest published frame, if there is one we have not drawn
+        frame = self.frames.take()
+        if frame is None:
+            return
+        (u, extent), sim_time = frame
+        self.renderer.draw(u, extent)
+        self.view.set_pixels(*self.renderer.display_pixels())
+        self.frames_rendered += 1
+
+    def update_rates(self):
+        now = time.perf_counter()
+        then, steps, rendered = self._rate_mark
+        elapsed = now - then
+        sim_steps = self.simulation.steps - steps
+        if sim_steps < 0:  # reset since the last update
+            sim_steps = self.simulation.steps
+        sim_seconds = sim_steps * self.simulation.clock_step()
+        self.rate_label.setText(f'Simulation: {sim_steps / elapsed:.0f} steps/s '
+                                f'({sim_seconds / elapsed:.2f}x real time) | '
+                                f'Display: {(self.frames_rendered - rendered) / elapsed:.0f} fps')
+        self._rate_mark = (now, self.simulation.steps, self.frames_rendered)
+
+    def closeEvent(self, event):
+        self.worker.stop()
+        super().closeEvent(event)
 
 if __name__ == '__main__':
     app = QApplication(sys.argv)
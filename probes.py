@@ -0,0 +1,167 @@
+import numpy as np
+
+from recording import write_npy_header
+
+# Probes sample the field of a Tank at fixed positions after every step, so
+# that time series at a few points or along a detector line never require
+# recording whole frames. Positions that fall on grid nodes are read through
+# a precomputed index array; any other position is interpolated bilinearly
+# from its four surrounding nodes with precomputed weights.
+
+ORIENTATIONS = ("horizontal", "vertical")
+# Distance from a grid node, in cells, below which a position counts as on it
+ON_GRID_TOLERANCE = 1e-9
+
+
+class Probe:
+    # Time series of the field at `positions` ((x, y) pairs in tank
+    # coordinates), sampled every `every` steps into a ring buffer holding the
+    # last `capacity` samples.
+    #
+    # With a path, every sample is also streamed to a (samples, positions) .npy
+    # file, with the sample times in <path>.times.npy. The rows are written in
+    # blocks of `capacity` samples, whenever the ring buffer wraps around, and
+    # the file is completed by close().
+    #
+    # The probe registers itself on the tank, so that Tank.advance(),
+    # DecomposedStepper and TankEnsemble sample it. With the analytic kernel,
+    # which only evaluates the last step of each advance(), a probe gets one
+    # sample per call. Read series() while holding the GUI worker's lock.
+    def __init__(self, tank, positions, capacity=4096, every=1, path=None, dtype=np.float64):
+        positions = np.asarray(positions, dtype=float).reshape(-1, 2)
+        if every < 1:
+            raise ValueError("every must be a positive number of steps.")
+        if capacity < 1:
+            raise ValueError("capacity must be a positive number of samples.")
+        x, y = positions[:, 0], positions[:, 1]
+        if np.any((x < 0) | (x > tank.width) | (y < 0) | (y > tank.height)):
+            raise ValueError("Probe positions must lie inside the tank.")
+        self.tank = tank
+        self.positions = positions
+        self.every = every
+        self.capacity = capacity
+        self.dtype = np.dtype(dtype)
+        self.count = 0
+
+        # Grid coordinates, in cells
+        columns, rows = x / tank.dx, y / tank.dy
+        if (np.all(np.abs(columns - np.round(columns)) < ON_GRID_TOLERANCE)
+                and np.all(np.abs(rows - np.round(rows)) < ON_GRID_TOLERANCE)):
+            self._index = np.round(rows).astype(int) * tank.resolution + np.round(columns).astype(int)
+            self._weights = None
+            self._gathered = np.empty(len(positions), dtype=tank.dtype)
+        else:
+            # Lower-left node of the cell around each position, kept one node
+            # inside the far edges so that positions on them interpolate too
+            c0 = np.minimum(np.floor(columns).astype(int), tank.resolution - 2)
+            r0 = np.minimum(np.floor(rows).astype(int), tank.resolution - 2)
+            fx, fy = columns - c0, rows - r0
+            corner = r0 * tank.resolution + c0
+            self._index = np.stack([corner, corner + 1, corner + tank.resolution,
+                                    corner + tank.resolution + 1], axis=1)
+            self._weights = np.stack([(1 - fx) * (1 - fy), fx * (1 - fy), (1 - fx) * fy, fx * fy],
+                                     axis=1).astype(tank.dtype)
+            self._gathered = np.empty(self._index.shape, dtype=tank.dtype)
+
+        self._values = np.empty((capacity, len(positions)), dtype=self.dtype)
+        self._times = np.empty(capacity)
+        self._head = 0
+        self._countdown = every
+
+        self.path = path
+        self._file = self._times_file = None
+        if path is not None:
+            self._file = open(path, "wb")
+            self._times_file = open(str(path) + ".times.npy", "wb")
+            self._write_headers(0)
+        tank.probes.append(self)
+
+    def sample(self, field, time):
+        self._countdown -= 1
+        if self._countdown:
+            return
+        self._countdown = self.every
+        row = self._values[self._head]
+        np.take(field.reshape(-1), self._index, out=self._gathered)
+        if self._weights is None:
+            row[...] = self._gathered
+        else:
+            self._gathered *= self._weights
+            np.sum(self._gathered, axis=1, out=row)
+        self._times[self._head] = time
+        self.count += 1
+        self._head += 1
+        if self._head == self.capacity:
+            self._head = 0
+            if self._file is not None:
+                self._file.write(self._values.tobytes())
+                self._times_file.write(self._times.tobytes())
+
+    def series(self):
+        # (times, values) of the samples still in the ring buffer, oldest first
+        if self.count < self.capacity:
+            return self._times[:self.count].copy(), self._values[:self.count].copy()
+        order = np.r_[self._head:self.capacity, 0:self._head]
+        return self._times[order], self._values[order]
+
+    def latest(self):
+        if self.count == 0:
+            return None
+        return self._values[self._head - 1].copy()
+
+    def _write_headers(self, samples):
+        write_npy_header(self._file, (samples, len(self.positions)), self.dtype)
+        write_npy_header(self._times_file, (samples,), np.dtype(float))
+
+    def close(self):
+        if self in self.tank.probes:
+            self.tank.probes.remove(self)
+        if self._file is None:
+            return
+        self._file.write(self._values[:self._head].tobytes())
+        self._times_file.write(self._times[:self._head].tobytes())
+        self._write_headers(self.count)
+        self._file.close()
+        self._times_file.close()
+        self._file = self._times_file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def point_probe(tank, position, **options):
+    return Probe(tank, [position], **options)
+
+
+def line_probe(tank, orientation, at, **options):
+    # Detector line across the whole tank along the grid row ("horizontal")
+    # or column ("vertical") nearest to y = at or x = at, read without
+    # interpolation
+    if orientation not in ORIENTATIONS:
+        raise ValueError("Invalid orientation. Choose 'horizontal' or 'vertical'.")
+    if orientation == "horizontal":
+        row = int(round(at / tank.dy))
+        positions = np.column_stack([np.arange(tank.resolution) * tank.dx, np.full(tank.resolution, row * tank.dy)])
+    else:
+        column = int(round(at / tank.dx))
+        positions = np.column_stack([np.full(tank.resolution, column * tank.dx), np.arange(tank.resolution) * tank.dy])
+    return Probe(tank, positions, **options)
+
+
+def polyline_probe(tank, vertices, spacing=None, **options):
+    # Samples every `spacing` (default: one grid cell) along the segments
+    # joining the vertices, including both ends
+    vertices = np.asarray(vertices, dtype=float)
+    if len(vertices) < 2:
+        raise ValueError("A polyline needs at least two vertices.")
+    if spacing is None:
+        spacing = min(tank.dx, tank.dy)
+    positions = [vertices[:1]]
+    for start, end in zip(vertices[:-1], vertices[1:]):
+        n = max(1, int(np.ceil(np.hypot(*(end - start)) / spacing)))
+        fraction = np.arange(1, n + 1)[:, np.newaxis] / n
+        positions.append(start + fraction * (end - start))
+    return Probe(tank, np.concatenate(positions), **options)
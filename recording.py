@@ -0,0 +1,119 @@
+import queue
+import struct
+import threading
+
+import numpy as np
+
+# Bytes reserved for the .npy header, so that the frame count in the shape can
+# be rewritten in place as the recording grows (a multiple of 64, as numpy uses)
+HEADER_BYTES = 128
+# Frames preallocated when the recording starts, and again whenever it fills up
+GROWTH_FRAMES = 256
+
+
+def write_npy_header(f, shape, dtype):
+    header = repr({'descr': np.lib.format.dtype_to_descr(dtype), 'fortran_order': False,
+                   'shape': tuple(shape)})
+    header = (header.ljust(HEADER_BYTES - 11) + "\n").encode('latin1')
+    if len(header) != HEADER_BYTES - 10:
+        raise ValueError("Frame shape is too large for the recording header.")
+    f.seek(0)
+    f.write(np.lib.format.MAGIC_PREFIX + bytes([1, 0]) + struct.pack('<H', len(header)) + header)
+
+
+class FrameRecorder:
+    # Records every `every`-th field of a Simulation into a (frames, rows, cols)
+    # .npy stack that np.load(path, mmap_mode='r') opens directly.
+    #
+    # The stepping thread only copies the recorded region onto a bounded
+    # queue; a background thread converts the frames to dtype and writes them
+    # into a memory-mapped file that is preallocated in GROWTH_FRAMES chunks,
+    # so RAM use does not grow with the length of the run. If the writer falls behind
+    # and the queue is full, frames are dropped (and counted in `dropped`)
+    # rather than stalling the simulation. The source time of every written
+    # frame is saved next to the stack as <path>.times.npy when the recorder is
+    # closed. Once attached, Simulation.run_steps() and step() feed it; call
+    # close() (or use it as a context manager) to finish the file.
+    def __init__(self, simulation, path, every=1, dtype=np.float32, region=None, queue_frames=64):
+        if every < 1:
+            raise ValueError("every must be a positive number of steps.")
+        if simulation.recorder is not None:
+            simulation.recorder.close()
+        self.simulation = simulation
+        self.path = path
+        self.every = every
+        self.dtype = np.dtype(dtype)
+        self.region = (slice(None), slice(None)) if region is None else region
+        self.frame_shape = simulation.tank.u[self.region].shape
+        self.frames = 0
+        self.dropped = 0
+
+        self._times = []
+        self._capacity = 0
+        self._file = open(path, "wb+")
+        self._grow()
+        self._countdown = every
+        self._queue = queue.Queue(maxsize=queue_frames)
+        self._writer = threading.Thread(target=self._write_frames, daemon=True)
+        self._writer.start()
+        simulation.recorder = self
+        self.capture(simulation.tank.u, simulation.time)
+
+    def _grow(self):
+        # Extend the file by GROWTH_FRAMES frames and map it again
+        self._capacity += GROWTH_FRAMES
+        write_npy_header(self._file, (self._capacity,) + self.frame_shape, self.dtype)
+        self._file.truncate(HEADER_BYTES + self._capacity * self.dtype.itemsize * int(np.prod(self.frame_shape)))
+        self._file.flush()
+        self._stack = np.memmap(self._file, dtype=self.dtype, mode='r+', offset=HEADER_BYTES,
+                                shape=(self._capacity,) + self.frame_shape)
+
+    def _write_frames(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            frame, time = item
+            if self.frames == self._capacity:
+                self._stack.flush()
+                self._grow()
+            self._stack[self.frames] = frame
+            self._times.append(time)
+            self.frames += 1
+
+    def steps_until_frame(self):
+        return self._countdown
+
+    def advance(self, n_steps, field, time):
+        # Called by Simulation.run_steps after n_steps (at most
+        # steps_until_frame()) physical steps
+        self._countdown -= n_steps
+        if self._countdown == 0:
+            self._countdown = self.every
+            self.capture(field, time)
+
+    def capture(self, field, time):
+        try:
+            self._queue.put_nowait((field[self.region].copy(), time))
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self):
+        if self.simulation.recorder is not self:
+            return
+        self.simulation.recorder = None
+        self._queue.put(None)
+        self._writer.join()
+        self._stack.flush()
+        del self._stack
+        # Trim the preallocated tail and record the final frame count
+        write_npy_header(self._file, (self.frames,) + self.frame_shape, self.dtype)
+        self._file.truncate(HEADER_BYTES + self.frames * self.dtype.itemsize * int(np.prod(self.frame_shape)))
+        self._file.close()
+        np.save(str(self.path) + ".times.npy", np.array(self._times))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,269 @@
+import os
+import warnings
+
+import numpy as np
+import matplotlib
+from PyQt5.QtCore import QRectF
+from PyQt5.QtWidgets import QGraphicsEllipseItem
+from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+from matplotlib.figure import Figure
+
+# Field view renderers for SimulationGUI. Each one builds a Qt widget for a tank
+# and draws frames of the field into it:
+#
+#   matplotlib  full figure redraw per frame (axes, ticks, markers and image)
+#   blit        matplotlib, redrawing only the image and markers over a cached
+#               background
+#   pyqtgraph   ImageItem fed with a uint8 buffer mapped through a colour
+#               lookup table; the fastest, requires pyqtgraph
+#
+# The INTERFERENCE_RENDERER environment variable selects the default.
+#
+# Renderers draw frames produced by a DisplayView, which cuts the visible
+# region out of the field and decimates it to about the on-screen pixel count.
+
+VMIN, VMAX = -1, 1  # Fixed scale for better contrast
+COLORMAP = 'seismic'
+DECIMATION_METHODS = ("stride", "mean")
+
+
+class DisplayView:
+    # Level of detail for the field view. extract() returns the visible region
+    # of the field (all of it, or the window set by set_region/zoom, in tank
+    # coordinates) reduced by an integer factor per axis so that it has at most
+    # `pixels` columns and rows, together with its extent in tank coordinates.
+    # "stride" keeps every n-th cell and costs the same at any grid size;
+    # "mean" averages n x n blocks, which avoids aliasing short waves but
+    # reads every cell of the region.
+    def __init__(self, tank, method="stride"):
+        if method not in DECIMATION_METHODS:
+            raise ValueError("Invalid decimation method. Choose 'stride' or 'mean'.")
+        self.width = tank.width
+        self.height = tank.height
+        self.method = method
+        self.pixels = (tank.resolution, tank.resolution)
+        self.region = None
+
+    def set_pixels(self, columns, rows):
+        self.pixels = (max(1, int(columns)), max(1, int(rows)))
+
+    def set_region(self, region):
+        # (x0, x1, y0, y1) in tank coordinates, or None for the whole tank
+        if region is not None:
+            x0, x1, y0, y1 = region
+            if not (0 <= x0 < x1 <= self.width and 0 <= y0 < y1 <= self.height):
+                raise ValueError(f"Region {region} is not inside the tank.")
+        self.region = region
+
+    def zoom(self, factor, centre=None):
+        # Show 1/factor of the tank in each direction around centre (default:
+        # the centre of the current region), kept inside the tank
+        if factor <= 1:
+            self.set_region(None)
+            return
+        if centre is None:
+            x0, x1, y0, y1 = self.region or (0, self.width, 0, self.height)
+            centre = ((x0 + x1) / 2, (y0 + y1) / 2)
+        half_width, half_height = self.width / factor / 2, self.height / factor / 2
+        x = min(max(centre[0], half_width), self.width - half_width)
+        y = min(max(centre[1], half_height), self.height - half_height)
+        self.set_region((x - half_width, x + half_width, y - half_height, y + half_height))
+
+    def extract(self, u):
+        rows, cols = u.shape
+        r0, r1, c0, c1 = 0, rows, 0, cols
+        region = self.region
+        if region is not None:
+            # Cell i covers [i, i + 1) * width / cols, as in Tank.plot's extent
+            x0, x1, y0, y1 = region
+            c0, c1 = int(x0 / self.width * cols), int(np.ceil(x1 / self.width * cols))
+            r0, r1 = int(y0 / self.height * rows), int(np.ceil(y1 / self.height * rows))
+        columns, lines = self.pixels
+        fx = max(1, -(-(c1 - c0) // columns))
+        fy = max(1, -(-(r1 - r0) // lines))
+        c1 = c0 + (c1 - c0) // fx * fx
+        r1 = r0 + (r1 - r0) // fy * fy
+        window = u[r0:r1, c0:c1]
+        if fx == fy == 1:
+            frame = window.copy()
+        elif self.method == "stride":
+            frame = window[::fy, ::fx].copy()
+        else:
+            frame = window.reshape((r1 - r0) // fy, fy, (c1 - c0) // fx, fx).mean(axis=(1, 3))
+        extent = (c0 * self.width / cols, c1 * self.width / cols,
+                  r0 * self.height / rows, r1 * self.height / rows)
+        return frame, extent
+
+
+def colormap_lut(name=COLORMAP, size=256):
+    return (matplotlib.colormaps[name](np.linspace(0, 1, size)) * 255).astype(np.uint8)
+
+
+class FieldMapper:
+    # Maps fields onto uint8 colour-table indices, reusing its buffers while
+    # the frame shape stays the same
+    def __init__(self, vmin=VMIN, vmax=VMAX):
+        self.vmin = vmin
+        self.scale = 255 / (vmax - vmin)
+        self._scaled = None
+        self._indices = None
+
+    def __call__(self, u):
+        if self._indices is None or self._indices.shape != u.shape:
+            self._scaled = np.empty(u.shape, dtype=np.float32)
+            self._indices = np.empty(u.shape, dtype=np.uint8)
+        np.subtract(u, self.vmin, out=self._scaled)
+        self._scaled *= self.scale
+        np.clip(self._scaled, 0, 255, out=self._scaled)
+        np.copyto(self._indices, self._scaled, casting='unsafe')
+        return self._indices
+
+
+class MatplotlibRenderer:
+    name = "matplotlib"
+
+    def __init__(self, tank):
+        self.figure = Figure(figsize=(5, 5))
+        self.canvas = FigureCanvas(self.figure)
+        self.widget = self.canvas
+        self.ax = self.figure.add_subplot(111)
+        self.im = tank.plot(self.ax)
+        # Tank.plot marks the image animated, which canvas.draw() skips; only
+        # BlitRenderer draws it separately
+        self.im.set_animated(False)
+        self.ax.set_title('Wave Interference Simulation')
+        self.ax.set_xlabel('X')
+        self.ax.set_ylabel('Y')
+        self._extent = (0, tank.width, 0, tank.height)
+
+    def display_pixels(self):
+        return self.ax.bbox.width, self.ax.bbox.height
+
+    def connect_click(self, callback):
+        # callback(x, y) in tank coordinates
+        def clicked(event):
+            if event.inaxes is self.ax:
+                callback(event.xdata, event.ydata)
+        self.canvas.mpl_connect('button_press_event', clicked)
+
+    def _set_extent(self, extent):
+        # Returns True when the extent changed; the axes follow the region
+        if extent is None or extent == self._extent:
+            return False
+        self._extent = extent
+        self.im.set_extent(extent)
+        self.ax.set_xlim(extent[0], extent[1])
+        self.ax.set_ylim(extent[2], extent[3])
+        return True
+
+    def draw(self, u, extent=None):
+        self._set_extent(extent)
+        self.im.set_array(u)
+        self.im.set_clim(vmin=VMIN, vmax=VMAX)  # Fixed color scaling
+        self.canvas.draw()
+
+
+class BlitRenderer(MatplotlibRenderer):
+    name = "blit"
+
+    def __init__(self, tank):
+        super().__init__(tank)
+        # The image, slit markers and obstacle circles are left out of full
+        # redraws and drawn over a copy of the rest of the figure instead
+        self._animated = [self.im] + list(self.ax.lines) + list(self.ax.patches)
+        for artist in self._animated:
+            artist.set_animated(True)
+        self._background = None
+        self.canvas.mpl_connect('draw_event', self._capture_background)
+
+    def _capture_background(self, event):
+        self._background = self.canvas.copy_from_bbox(self.figure.bbox)
+        self._draw_animated()
+
+    def _draw_animated(self):
+        for artist in self._animated:
+            self.ax.draw_artist(artist)
+
+    def draw(self, u, extent=None):
+        self.im.set_array(u)
+        if self._set_extent(extent) or self._background is None:
+            self.canvas.draw()  # captures the background
+            return
+        self.canvas.restore_region(self._background)
+        self._draw_animated()
+        self.canvas.blit(self.ax.bbox)
+
+
+class PyqtgraphRenderer:
+    name = "pyqtgraph"
+
+    def __init__(self, tank):
+        try:
+            import pyqtgraph as pg
+        except ImportError:
+            raise ImportError("The pyqtgraph renderer requires the pyqtgraph package.") from None
+
+        self.widget = pg.PlotWidget(title='Wave Interference Simulation', labels={'bottom': 'X', 'left': 'Y'})
+        self.widget.setAspectLocked(True)
+        # The view follows the DisplayView region rather than the mouse
+        self.widget.setMouseEnabled(x=False, y=False)
+        self.widget.hideButtons()
+        self._extent = (0, tank.width, 0, tank.height)
+        self.widget.setRange(xRange=(0, tank.width), yRange=(0, tank.height), padding=0)
+        # Row-major with y pointing up, like imshow(origin='lower')
+        self.image = pg.ImageItem(axisOrder='row-major')
+        self.image.setRect(QRectF(0, 0, tank.width, tank.height))
+        self.widget.addItem(self.image)
+        self.lut = colormap_lut()
+        self.mapper = FieldMapper()
+
+        if tank.slits:
+            positions = np.array([slit.position for slit in tank.slits], dtype=float)
+            self.widget.plot(positions[:, 0], positions[:, 1], pen=None, symbol='o',
+                             symbolSize=5, symbolBrush='k', symbolPen='k')
+        for obstacle in tank.obstacles:
+            (x, y), r = obstacle.position, obstacle.radius
+            circle = QGraphicsEllipseItem(x - r, y - r, 2 * r, 2 * r)
+            circle.setPen(pg.mkPen('k'))
+            self.widget.addItem(circle)
+
+    def display_pixels(self):
+        view = self.widget.getViewBox()
+        return view.width(), view.height()
+
+    def connect_click(self, callback):
+        view = self.widget.getViewBox()
+
+        def clicked(event):
+            point = view.mapSceneToView(event.scenePos())
+            callback(point.x(), point.y())
+        self.widget.scene().sigMouseClicked.connect(clicked)
+
+    def draw(self, u, extent=None):
+        self.image.setImage(self.mapper(u), lut=self.lut, levels=(0, 255), autoLevels=False)
+        if extent is not None and extent != self._extent:
+            self._extent = extent
+            x0, x1, y0, y1 = extent
+            self.image.setRect(QRectF(x0, y0, x1 - x0, y1 - y0))
+            self.widget.setRange(xRange=(x0, x1), yRange=(y0, y1), padding=0)
+
+
+RENDERERS = {
+    "matplotlib": MatplotlibRenderer,
+    "blit": BlitRenderer,
+    "pyqtgraph": PyqtgraphRenderer,
+}
+
+
+def get_renderer(name, tank):
+    # Resolve a renderer by name, falling back to matplotlib when an optional
+    # dependency is missing
+    if name is None:
+        name = os.environ.get("INTERFERENCE_RENDERER", "matplotlib")
+    if name not in RENDERERS:
+        raise ValueError(f"Invalid renderer '{name}'. Choose one of: {', '.join(RENDERERS)}.")
+    try:
+        return RENDERERS[name](tank)
+    except ImportError as exc:
+        warnings.warn(f"{exc} Falling back to the matplotlib renderer.")
+        return MatplotlibRenderer(tank)
@@ -1,5 +1,28 @@
+import json
+import warnings
+
 import numpy as np
-import matplotlib.pyplot as plt
+
+from backends import get_backend
+
+# Time-stepping policies: "fixed" keeps the historical dt = 0.05 * min(dx, dy) / c
+# with time_scale speeding up the source clock only; "cfl" runs at a Courant
+# number of the 2-D leapfrog stability limit and time_scale sets the substep count
+TIME_STEPPING_POLICIES = ("fixed", "cfl")
+BOUNDARY_TYPES = ("reflective", "absorbing", "open", "mur")
+KERNELS = ("inplace", "reference", "spectral", "analytic")
+# The spectral kernel propagates a periodic field; "open" adds a sponge layer
+# along the edges so that outgoing waves are damped instead of wrapping around
+SPECTRAL_BOUNDARY_TYPES = ("periodic", "open", "absorbing")
+# The analytic kernel superposes free-space waves, so nothing is reflected
+ANALYTIC_BOUNDARY_TYPES = ("open",)
+SPONGE_WIDTH = 40  # cells
+# Damping rate at the outer edge of the sponge, in units of the inverse time a
+# wave takes to cross it, so that absorption does not depend on c, dt or dx
+SPONGE_STRENGTH = 3
+FIXED_DT_FACTOR = 0.05
+# Floating-point type of the field, its scratch buffers and the masks
+PRECISIONS = ("float64", "float32")
 
 class Slit:
     def __init__(self, position, width, amplitude, frequency, wavelength):
@@ -28,8 +51,56 @@ class Obstacle:
         self.boundary_type = "reflective"  # Can be "reflective", "absorbing", or "open"
 
 
+class SourceStore:
+    # Array-backed table of sources with one float column per field, grown by
+    # doubling. version changes on every edit so tanks can cache derived data.
+    def __init__(self, fields):
+        self.fields = fields
+        self.version = 0
+        self._size = 0
+        self._columns = {name: np.empty((4, width) if width > 1 else 4)
+                         for name, width in fields.items()}
+
+    def append(self, **values):
+        if self._size == len(next(iter(self._columns.values()))):
+            for name, column in self._columns.items():
+                grown = np.empty((2 * len(column),) + column.shape[1:])
+                grown[:self._size] = column[:self._size]
+                self._columns[name] = grown
+        for name in self.fields:
+            self._columns[name][self._size] = values[name]
+        self._size += 1
+        self.version += 1
+
+    def column(self, name):
+        return self._columns[name][:self._size]
+
+    def clear(self):
+        self._size = 0
+        self.version += 1
+
+    def __len__(self):
+        return self._size
+
+    def __iter__(self):
+        for i in range(self._size):
+            yield {name: tuple(column[i]) if column.ndim > 1 else column[i]
+                   for name, column in self._columns.items()}
+
+
+WAVE_PACKET_FIELDS = {'position': 2, 'amplitude': 1, 'frequency': 1, 'wavelength': 1,
+                      'width': 1, 'direction': 2}
+INTERFERENCE_POINT_FIELDS = {'position': 2, 'amplitude': 1, 'frequency': 1}
+
+
 class Tank:
-    def __init__(self, width, height, resolution, slits, depth=1.0, decay_factor=0.999):
+    def __init__(self, width, height, resolution, slits, depth=1.0, decay_factor=0.999,
+                 kernel="inplace", backend=None, time_stepping="fixed", courant=0.9,
+                 precision="float64"):
+        if kernel not in KERNELS:
+            raise ValueError("Invalid kernel. Choose 'inplace', 'reference', 'spectral' or 'analytic'.")
+        if precision not in PRECISIONS:
+            raise ValueError("Invalid precision. Choose 'float64' or 'float32'.")
         self.width = width
         self.height = height
         self.resolution = resolution
@@ -37,54 +108,447 @@ class Tank:
         self.obstacles = []
         self.depth = depth
         self.decay_factor = decay_factor
-        self.boundary_type = "reflective"
+        self.kernel = kernel
+        self.boundary_type = self.boundary_types()[0]
+        self.precision = precision
+        self.dtype = np.dtype(precision)
 
         self.dx = width / (resolution - 1)
         self.dy = height / (resolution - 1)
         self.c = 10 * np.sqrt(self.depth)  # Wave speed depends on depth
-        self.dt = 0.05 * min(self.dx, self.dy) / self.c
+        self.set_time_stepping(time_stepping, courant)
 
         self.x = np.linspace(0, width, resolution)
         self.y = np.linspace(0, height, resolution)
-        self.X, self.Y = np.meshgrid(self.x, self.y)
-
-        self.u = np.zeros((resolution, resolution))
-        self.u_prev = np.zeros((resolution, resolution))
-
-        self.boundary = np.ones((resolution, resolution))
+        # Full-grid coordinates as read-only broadcasting views of x and y:
+        # they index and slice like meshgrid output but take no memory
+        self.X = np.broadcast_to(self.x, (resolution, resolution))
+        self.Y = np.broadcast_to(self.y[:, np.newaxis], (resolution, resolution))
+
+        # Three-level rotation: u_prev <- u <- u_next, swapped by reference each step
+        self.backend = get_backend(backend)
+        # Optional replacement for advance(), e.g. a DecomposedStepper
+        self.stepper = None
+        # probes.Probe instances sampled after every step
+        self.probes = []
+        self.u = np.zeros((resolution, resolution), dtype=self.dtype)
+        self.u_prev = np.zeros((resolution, resolution), dtype=self.dtype)
+        self.u_next = np.zeros((resolution, resolution), dtype=self.dtype)
+        # Interior scratch buffers reused by the in-place kernel
+        self._twice = np.empty((resolution - 2, resolution - 2), dtype=self.dtype)
+        self._lap = np.empty((resolution - 2, resolution - 2), dtype=self.dtype)
+
+        # Interior multiplier folding the distance-based decay and the boundary
+        # mask together; rebuilt by update_damping() whenever either changes
+        self.damping = np.ones((resolution - 2, resolution - 2), dtype=self.dtype)
+        # Full-grid counterpart for the spectral kernel, which also steps the
+        # edges; built on first use and dropped by update_damping()
+        self.spectral_damping = None
+        self._spectral_damping_key = None
+        self._spectral_key = None
+        self._spectral_operator = None
+
+        # True on open water, False on the tank walls and obstacles
+        self.boundary = np.ones((resolution, resolution), dtype=bool)
+        # Normalised distance to the nearest slit, built on first use (see
+        # distance_map); a tank without decay never needs it
+        self._distance_map = None
         self.update_boundary()
 
-        # Create distance map from slits
-        self.distance_map = np.ones((resolution, resolution)) * np.inf
-        self.update_distance_map()
-
-        self.wave_packets = []
-        self.interference_points = []
+        self._slit_key = None
+        self._slit_operator = None
+        self._analytic_key = None
+        self._analytic_operator = None
+
+        self.wave_packets = SourceStore(WAVE_PACKET_FIELDS)
+        self.interference_points = SourceStore(INTERFERENCE_POINT_FIELDS)
+        self._packet_key = None
+        self._packet_operator = None
+        self._point_key = None
+        self._point_operator = None
         self.standing_wave_mode = None
+        self._standing_wave_key = None
+        self._standing_wave = None
+
+    @property
+    def distance_map(self):
+        if self._distance_map is None:
+            distance_map = np.full((self.resolution, self.resolution), np.inf, dtype=self.dtype)
+            for slit in self.slits:
+                x, y = slit.position
+                slit_distances = np.sqrt((self.x - x)**2 + ((self.y - y)**2)[:, np.newaxis])
+                np.minimum(distance_map, slit_distances, out=distance_map)
+            # Normalize distance map; without slits there is nothing to decay from
+            if self.slits:
+                distance_map /= np.max(distance_map)
+            else:
+                distance_map.fill(0)
+            self._distance_map = distance_map
+        return self._distance_map
+
+    @distance_map.setter
+    def distance_map(self, distance_map):
+        self._distance_map = distance_map
 
     def update_distance_map(self):
-        self.distance_map.fill(np.inf)
-        for slit in self.slits:
-            x, y = slit.position
-            slit_distances = np.sqrt((self.X - x)**2 + (self.Y - y)**2)
-            self.distance_map = np.minimum(self.distance_map, slit_distances)
-        # Normalize distance map
-        self.distance_map /= np.max(self.distance_map)
+        # Call after moving, adding or removing slits
+        self._distance_map = None
+        self.update_damping()
 
     def update_boundary(self):
-        self.boundary.fill(1)
+        self.boundary.fill(True)
         # Set tank boundaries
-        self.boundary[0, :] = 0
-        self.boundary[-1, :] = 0
-        self.boundary[:, 0] = 0
-        self.boundary[:, -1] = 0
+        self.boundary[0, :] = False
+        self.boundary[-1, :] = False
+        self.boundary[:, 0] = False
+        self.boundary[:, -1] = False
 
-        # Set obstacles
+        # Set obstacles, testing only the cells around each one's bounding box
         for obstacle in self.obstacles:
-            mask = (self.X - obstacle.position[0])**2 + (self.Y - obstacle.position[1])**2 <= obstacle.radius**2
-            self.boundary[mask] = 0
+            (x, y), radius = obstacle.position, obstacle.radius
+            c0 = max(0, np.searchsorted(self.x, x - radius) - 1)
+            c1 = np.searchsorted(self.x, x + radius, side='right') + 1
+            r0 = max(0, np.searchsorted(self.y, y - radius) - 1)
+            r1 = np.searchsorted(self.y, y + radius, side='right') + 1
+            mask = (self.x[c0:c1] - x)**2 + ((self.y[r0:r1] - y)**2)[:, np.newaxis] <= radius**2
+            self.boundary[r0:r1, c0:c1][mask] = False
+        self.update_damping()
+
+    def step_decay(self, region=(slice(None), slice(None))):
+        # Decay multiplier applied per step to a region of the grid, from the
+        # normalised distance to the slits. decay_factor is the decay per step
+        # of the "fixed" policy at distance 1; other step sizes raise it to the
+        # power dt / dt_fixed, so that the decay per unit of time is the same.
+        if self.decay_factor == 1:
+            return np.ones(self.boundary[region].shape, dtype=self.dtype)
+        decay = 1 - (1 - self.decay_factor) * self.distance_map[region]
+        exponent = self.dt / self.fixed_dt()
+        if exponent != 1:
+            np.power(decay, exponent, out=decay)
+        return decay
+
+    def update_damping(self):
+        np.copyto(self.damping, self.step_decay((slice(1, -1), slice(1, -1))))
+        if self.boundary_type in ("reflective", "mur"):
+            self.damping *= self.boundary[1:-1, 1:-1]
+        elif self.boundary_type == "absorbing":
+            # Only apply obstacle boundaries, allow waves to be absorbed at edges
+            self.damping[1:-1, 1:-1] *= self.boundary[2:-2, 2:-2]
+        self.spectral_damping = None
+
+    def update_spectral_damping(self):
+        # Decay and obstacles over the whole (periodic) grid, plus the sponge
+        # layer of an "open" spectral tank. Obstacles are imposed by zeroing
+        # their cells every step, which is only approximate in a spectral scheme.
+        damping = self.step_decay()
+        damping[1:-1, 1:-1] *= self.boundary[1:-1, 1:-1]
+        if self.boundary_type == "open":
+            n = self.resolution
+            depth = np.minimum(np.arange(n), np.arange(n)[::-1])
+            depth = np.minimum(depth, depth[:, np.newaxis])
+            ramp = np.clip((SPONGE_WIDTH - depth) / SPONGE_WIDTH, 0, 1)
+            rate = SPONGE_STRENGTH * self.c / (SPONGE_WIDTH * min(self.dx, self.dy))
+            damping *= np.exp(-rate * self.dt * ramp**2)
+        self.spectral_damping = damping.astype(self.dtype)
+        self._spectral_damping_key = (self.c, self.dt)
 
     def update(self, time):
+        self._step(time, self._prepare_sources())
+
+    def advance(self, n_steps, t0=0.0, time_step=None):
+        # Run n_steps updates with the source clock starting at t0, doing the
+        # per-scene source setup once. Returns the source time after the last step.
+        if time_step is None:
+            time_step = self.dt
+        if self.stepper is not None:
+            return self.stepper.advance(n_steps, t0, time_step)
+        if self.kernel == "analytic":
+            # The field only depends on the time, so only the last step is evaluated
+            time = t0 + n_steps * time_step
+            self._step(time, None)
+            return time
+        sources = self._prepare_sources()
+        step = self._step
+        time = t0
+        for _ in range(n_steps):
+            time += time_step
+            step(time, sources)
+        return time
+
+    def _step(self, time, sources):
+        if self.kernel == "analytic":
+            self._update_field_analytic(time)
+            for probe in self.probes:
+                probe.sample(self.u, time)
+            return
+        if self.kernel == "reference":
+            self._update_field_reference()
+        elif self.kernel == "spectral":
+            self._update_field_spectral()
+        else:
+            self._update_field_inplace()
+        self._finish_step(time, sources)
+
+    def _finish_step(self, time, sources):
+        # Serial part of a step, run once the interior of u has been updated
+        self._inject_sources(time, sources)
+
+        # Handle boundary conditions
+        if self.boundary_type == "open":
+            # Do nothing, allowing waves to pass through edges unaffected
+            pass
+        elif self.boundary_type == "absorbing":
+            # Gradual absorption at edges
+            edge_width = 10
+            edge_factor = np.linspace(0, 1, edge_width)[:, np.newaxis]
+
+            self.u[:edge_width, :] *= edge_factor
+            self.u[-edge_width:, :] *= edge_factor[::-1]
+            self.u[:, :edge_width] *= edge_factor.T
+            self.u[:, -edge_width:] *= edge_factor[::-1].T
+
+        for probe in self.probes:
+            probe.sample(self.u, time)
+
+    def _prepare_sources(self):
+        # Everything about the sources that does not depend on time
+        slit_sources = self._compiled_slits()
+
+        packet_sources = self._compiled_packets()
+        point_sources = self._compiled_points()
+
+        standing_wave = self._standing_wave_profile()
+
+        # Per-cell source gains, only needed when sources are rescaled (see set_dt)
+        gains = None
+        if self.source_gain != 1:
+            gains = tuple(None if sources is None else self._cell_gains(sources[0])
+                          for sources in (slit_sources, packet_sources, point_sources))
+
+        return slit_sources, packet_sources, point_sources, standing_wave, gains
+
+    def _cell_gains(self, index):
+        # Interior cells are stepped by the stencil, so a value added there acts
+        # as a forcing term and scales with dt**2. Edge cells only accumulate what
+        # is added to them, so their gain scales with dt. The spectral kernel
+        # steps every cell.
+        if self.kernel == "spectral":
+            return np.full(index.size, self.source_gain)
+        rows, cols = np.divmod(index, self.resolution)
+        edge = (rows == 0) | (rows == self.resolution - 1) | (cols == 0) | (cols == self.resolution - 1)
+        return np.where(edge, np.sqrt(self.source_gain), self.source_gain)
+
+    def _compiled_slits(self):
+        # Slit geometry flattened into cell indices with per-cell phase offsets,
+        # rebuilt only when a slit property (or the grid spacing) changes
+        key = (self.dx, self.dy, tuple((slit.position, slit.width, slit.amplitude,
+                                        slit.frequency, slit.wavelength) for slit in self.slits))
+        if key != self._slit_key:
+            self._slit_key = key
+            self._slit_operator = self._compile_slits()
+        return self._slit_operator
+
+    def slit_cells(self, slit):
+        # Row and column slices of the cells a slit drives, or None for a slit
+        # that is not on an edge
+        x, y = slit.position
+        x_idx, y_idx = int(x / self.dx), int(y / self.dy)
+        slit_width = max(1, int(slit.width / self.dx))
+
+        if x_idx == 0:  # Left side
+            x_range = slice(0, 3)
+            y_range = slice(max(0, y_idx - slit_width//2), min(self.resolution, y_idx + slit_width//2 + 1))
+        elif x_idx == self.resolution - 1:  # Right side
+            x_range = slice(self.resolution - 3, self.resolution)
+            y_range = slice(max(0, y_idx - slit_width//2), min(self.resolution, y_idx + slit_width//2 + 1))
+        elif y_idx == 0:  # Bottom side
+            x_range = slice(max(0, x_idx - slit_width//2), min(self.resolution, x_idx + slit_width//2 + 1))
+            y_range = slice(0, 3)
+        elif y_idx == self.resolution - 1:  # Top side
+            x_range = slice(max(0, x_idx - slit_width//2), min(self.resolution, x_idx + slit_width//2 + 1))
+            y_range = slice(self.resolution - 3, self.resolution)
+        else:
+            return None
+        return y_range, x_range
+
+    def _compile_slits(self):
+        index, amplitude, frequency, phase = [], [], [], []
+        for slit in self.slits:
+            cells = self.slit_cells(slit)
+            if cells is None:
+                continue  # Skip if slit is not on the edge
+            y_range, x_range = cells
+
+            rows, cols = np.mgrid[y_range, x_range]
+            cells = (rows * self.resolution + cols).ravel()
+            index.append(cells)
+            amplitude.append(np.full(cells.size, slit.amplitude, dtype=float))
+            frequency.append(np.full(cells.size, slit.frequency, dtype=float))
+            phase.append(self.X[y_range, x_range].ravel() / slit.wavelength)
+
+        if not index:
+            return None
+        index = np.concatenate(index)
+        return (index, np.concatenate(amplitude), np.concatenate(frequency),
+                np.concatenate(phase), np.empty(index.size))
+
+    def _compiled_analytic(self):
+        # Steady state of the slits as point sources in open water: each adds
+        # A g(r) sin(w t - k r - psi) at distance r, with k = w / c, the slit
+        # phase psi = 2 pi x / wavelength of its cells (see _compile_slits) and
+        # cylindrical spreading g(r) = sqrt(L / max(r, L)) for L = c / f.
+        # Split as sin(w t) A g cos(phi) - cos(w t) A g sin(phi) and summed over
+        # slits of the same frequency, a frame costs two multiply-adds per cell
+        # and frequency.
+        key = (self.c, self.dx, self.dy, tuple((slit.position, slit.amplitude, slit.frequency,
+                                                slit.wavelength) for slit in self.slits))
+        if key != self._analytic_key:
+            self._analytic_key = key
+            terms = {}
+            for slit in self.slits:
+                x, y = slit.position
+                distance = np.sqrt((self.x - x)**2 + ((self.y - y)**2)[:, np.newaxis])
+                length = self.c / slit.frequency
+                envelope = slit.amplitude * np.sqrt(length / np.maximum(distance, length))
+                phase = 2 * np.pi * (distance / length + x / slit.wavelength)
+                if slit.frequency not in terms:
+                    terms[slit.frequency] = (np.zeros(self.u.shape), np.zeros(self.u.shape))
+                cos_part, sin_part = terms[slit.frequency]
+                cos_part += envelope * np.cos(phase)
+                sin_part += envelope * np.sin(phase)
+            self._analytic_operator = [(2 * np.pi * frequency, cos_part.astype(self.dtype),
+                                        sin_part.astype(self.dtype))
+                                       for frequency, (cos_part, sin_part) in terms.items()]
+        return self._analytic_operator
+
+    def _compiled_packets(self):
+        # Per-packet spatial envelope and phase, cached until packets are added
+        # or cleared. The wave A*g*sin(w*t - phi) is split into A*g*cos(phi) and
+        # A*g*sin(phi) parts so each step only needs sin(w*t) and cos(w*t).
+        key = (self.wave_packets.version, self.dx, self.dy)
+        if key != self._packet_key:
+            self._packet_key = key
+            self._packet_operator = self._compile_packets()
+        return self._packet_operator
+
+    def _compile_packets(self):
+        packets = self.wave_packets
+        index, owner, cos_part, sin_part = [], [], [], []
+        for k, packet in enumerate(packets):
+            x, y = packet['position']
+            width = packet['width']
+            direction = packet['direction']
+
+            x_range = slice(max(0, int((x - width) / self.dx)), min(self.resolution, int((x + width) / self.dx)))
+            y_range = slice(max(0, int((y - width) / self.dy)), min(self.resolution, int((y + width) / self.dy)))
+
+            distance = (self.X[y_range, x_range] - x) * direction[0] + (self.Y[y_range, x_range] - y) * direction[1]
+            gaussian = np.exp(-(distance**2) / (2 * width**2))
+            envelope = (packet['amplitude'] * gaussian).ravel()
+            phase = (2 * np.pi * distance / packet['wavelength']).ravel()
+
+            rows, cols = np.mgrid[y_range, x_range]
+            index.append((rows * self.resolution + cols).ravel())
+            owner.append(np.full(envelope.size, k))
+            cos_part.append(envelope * np.cos(phase))
+            sin_part.append(envelope * np.sin(phase))
+
+        if not index:
+            return None
+        index = np.concatenate(index)
+        omega = 2 * np.pi * packets.column('frequency')
+        return (index, np.concatenate(owner), np.concatenate(cos_part), np.concatenate(sin_part),
+                omega, np.empty(len(packets)), np.empty(len(packets)),
+                np.empty(index.size), np.empty(index.size))
+
+    def _compiled_points(self):
+        key = (self.interference_points.version, self.dx, self.dy)
+        if key != self._point_key:
+            self._point_key = key
+            points = self.interference_points
+            if len(points) == 0:
+                self._point_operator = None
+            else:
+                position = points.column('position')
+                x_idx = (position[:, 0] / self.dx).astype(int)
+                y_idx = (position[:, 1] / self.dy).astype(int)
+                self._point_operator = (y_idx * self.resolution + x_idx,
+                                        points.column('amplitude').copy(),
+                                        2 * np.pi * points.column('frequency'),
+                                        np.empty(len(points)))
+        return self._point_operator
+
+    def _standing_wave_profile(self):
+        # The mode shape only varies along x, so it is cached as a 1-D row
+        # profile and broadcast over the rows when injected
+        if self.standing_wave_mode is None:
+            return None
+        key = (self.standing_wave_mode, self.width, self.resolution)
+        if key != self._standing_wave_key:
+            mode = self.standing_wave_mode
+            amplitude = 0.5  # Adjust as needed
+            self._standing_wave_key = key
+            self._standing_wave = (amplitude * np.sin(mode * np.pi * self.x / self.width),
+                                   np.empty(self.resolution))
+        return self._standing_wave
+
+    def _inject_sources(self, time, sources):
+        slit_sources, packet_sources, point_sources, standing_wave, gains = sources
+        u = self.u
+
+        # Generate new waves at slits: one scatter-add over all slit cells
+        if slit_sources is not None:
+            index, amplitude, frequency, phase, wave = slit_sources
+            np.multiply(frequency, time, out=wave)
+            wave -= phase
+            wave *= 2 * np.pi
+            np.sin(wave, out=wave)
+            wave *= amplitude
+            if gains is not None:
+                wave *= gains[0]
+            self.backend.scatter_add(u.reshape(-1), index, wave)
+
+        # Generate wave packets
+        if packet_sources is not None:
+            index, owner, cos_part, sin_part, omega, sin_t, cos_t, wave, scratch = packet_sources
+            np.multiply(omega, time, out=sin_t)
+            np.cos(sin_t, out=cos_t)
+            np.sin(sin_t, out=sin_t)
+            np.take(sin_t, owner, out=wave)
+            wave *= cos_part
+            np.take(cos_t, owner, out=scratch)
+            scratch *= sin_part
+            wave -= scratch
+            if gains is not None:
+                wave *= gains[1]
+            self.backend.scatter_add(u.reshape(-1), index, wave)
+
+        # Generate interference points
+        if point_sources is not None:
+            index, amplitude, omega, wave = point_sources
+            np.multiply(omega, time, out=wave)
+            np.sin(wave, out=wave)
+            wave *= amplitude
+            if gains is not None:
+                wave *= gains[2]
+            self.backend.scatter_add(u.reshape(-1), index, wave)
+
+        # Generate standing wave
+        if standing_wave is not None:
+            profile, row = standing_wave
+            np.multiply(profile, np.sin(2 * np.pi * time), out=row)
+            if gains is None:
+                u += row
+            else:
+                gain = self.source_gain
+                edge_gain = gain if self.kernel == "spectral" else np.sqrt(gain)
+                u[1:-1, 1:-1] += row[1:-1] * gain
+                u[0, :] += row * edge_gain
+                u[-1, :] += row * edge_gain
+                u[1:-1, 0] += row[0] * edge_gain
+                u[1:-1, -1] += row[-1] * edge_gain
+
+    def _update_field_reference(self):
         # FDTD update with depth consideration
         laplacian = (
             (self.u[1:-1, 2:] + self.u[1:-1, :-2] - 2 * self.u[1:-1, 1:-1]) / self.dx**2 +
@@ -95,11 +559,11 @@ class Tank:
                   self.c**2 * self.dt**2 * laplacian)
 
         # Apply distance-based decay factor
-        decay = 1 - (1 - self.decay_factor) * self.distance_map[1:-1, 1:-1]
+        decay = self.step_decay((slice(1, -1), slice(1, -1)))
         u_next *= decay
 
         # Apply boundary conditions
-        if self.boundary_type == "reflective":
+        if self.boundary_type in ("reflective", "mur"):
             u_next *= self.boundary[1:-1, 1:-1]
         elif self.boundary_type == "absorbing":
             # Only apply obstacle boundaries, allow waves to be absorbed at edges
@@ -113,120 +577,190 @@ class Tank:
 
         self.u_prev = self.u.copy()
         self.u[1:-1, 1:-1] = u_next
-
-        # Generate new waves at slits
-        for slit in self.slits:
-            x, y = slit.position
-            x_idx, y_idx = int(x / self.dx), int(y / self.dy)
-            slit_width = max(1, int(slit.width / self.dx))
-
-            if x_idx == 0:  # Left side
-                x_range = slice(0, 3)
-                y_range = slice(max(0, y_idx - slit_width//2), min(self.resolution, y_idx + slit_width//2 + 1))
-            elif x_idx == self.resolution - 1:  # Right side
-                x_range = slice(self.resolution - 3, self.resolution)
-                y_range = slice(max(0, y_idx - slit_width//2), min(self.resolution, y_idx + slit_width//2 + 1))
-            elif y_idx == 0:  # Bottom side
-                x_range = slice(max(0, x_idx - slit_width//2), min(self.resolution, x_idx + slit_width//2 + 1))
-                y_range = slice(0, 3)
-            elif y_idx == self.resolution - 1:  # Top side
-                x_range = slice(max(0, x_idx - slit_width//2), min(self.resolution, x_idx + slit_width//2 + 1))
-                y_range = slice(self.resolution - 3, self.resolution)
-            else:
-                continue  # Skip if slit is not on the edge
-
-            slit_wave = slit.amplitude * np.sin(2 * np.pi * (slit.frequency * time - self.X[y_range, x_range] / slit.wavelength))
-            self.u[y_range, x_range] += slit_wave
-
-        # Generate wave packets
-        for packet in self.wave_packets:
-            x, y = packet['position']
-            amplitude = packet['amplitude']
-            frequency = packet['frequency']
-            wavelength = packet['wavelength']
-            width = packet['width']
-            direction = packet['direction']
-
-            x_range = slice(max(0, int((x - width) / self.dx)), min(self.resolution, int((x + width) / self.dx)))
-            y_range = slice(max(0, int((y - width) / self.dy)), min(self.resolution, int((y + width) / self.dy)))
-
-            distance = (self.X[y_range, x_range] - x) * direction[0] + (self.Y[y_range, x_range] - y) * direction[1]
-            gaussian = np.exp(-(distance**2) / (2 * width**2))
-            packet_wave = amplitude * np.sin(2 * np.pi * (frequency * time - distance / wavelength)) * gaussian
-
-            self.u[y_range, x_range] += packet_wave
-
-        # Generate interference points
-        for point in self.interference_points:
-            x, y = point['position']
-            amplitude = point['amplitude']
-            frequency = point['frequency']
-            x_idx, y_idx = int(x / self.dx), int(y / self.dy)
-            self.u[y_idx, x_idx] += amplitude * np.sin(2 * np.pi * frequency * time)
-
-        # Generate standing wave
-        if self.standing_wave_mode is not None:
-            mode = self.standing_wave_mode
-            amplitude = 0.5  # Adjust as needed
-            standing_wave = amplitude * np.sin(mode * np.pi * self.X / self.width) * np.sin(2 * np.pi * time)
-            self.u += standing_wave
-
-        # Handle boundary conditions
-        if self.boundary_type == "open":
-            # Do nothing, allowing waves to pass through edges unaffected
-            pass
-        elif self.boundary_type == "absorbing":
-            # Gradual absorption at edges
-            edge_width = 10
-            edge_factor = np.linspace(0, 1, edge_width)[:, np.newaxis]
-
-            self.u[:edge_width, :] *= edge_factor
-            self.u[-edge_width:, :] *= edge_factor[::-1]
-            self.u[:, :edge_width] *= edge_factor.T
-            self.u[:, -edge_width:] *= edge_factor[::-1].T
-
+        if self.boundary_type == "mur":
+            self._apply_mur(self.u_prev, self.u)
+
+    def _update_field_inplace(self):
+        # Same arithmetic as _update_field_reference, evaluated by the backend
+        # into preallocated buffers so that stepping does not allocate full grids
+        u, u_prev, u_next = self.u, self.u_prev, self.u_next
+        self.backend.update_field(self, u, u_prev, u_next)
+        self._rotate()
+
+    def _update_field_analytic(self, time):
+        u, scratch = self.u, self.u_next
+        u.fill(0)
+        for omega, cos_part, sin_part in self._compiled_analytic():
+            np.multiply(cos_part, np.sin(omega * time), out=scratch)
+            u += scratch
+            np.multiply(sin_part, np.cos(omega * time), out=scratch)
+            u -= scratch
+
+    def _spectral_propagator(self):
+        # 2 cos(c |k| dt) on the rfft2 grid. For the homogeneous wave equation
+        # u(t + dt) + u(t - dt) = 2 cos(c |k| dt) u(t) holds exactly for each
+        # Fourier mode, so the scheme has no dispersion error at any dt and
+        # resolves waves down to two points per wavelength.
+        key = (self.c, self.dt, self.dx, self.dy, self.resolution)
+        if key != self._spectral_key:
+            kx = 2 * np.pi * np.fft.rfftfreq(self.resolution, d=self.dx)
+            ky = 2 * np.pi * np.fft.fftfreq(self.resolution, d=self.dy)
+            k = np.sqrt(kx**2 + ky[:, np.newaxis]**2)
+            self._spectral_key = key
+            self._spectral_operator = 2 * np.cos(self.c * self.dt * k)
+        return self._spectral_operator
+
+    def _update_field_spectral(self):
+        # One forward and one inverse FFT per step; u_prev is subtracted in
+        # real space
+        u, u_prev, u_next = self.u, self.u_prev, self.u_next
+        spectrum = np.fft.rfft2(u)
+        spectrum *= self._spectral_propagator()
+        u_next[...] = np.fft.irfft2(spectrum, s=u.shape)
+        u_next -= u_prev
+        if self.spectral_damping is None or self._spectral_damping_key != (self.c, self.dt):
+            self.update_spectral_damping()
+        u_next *= self.spectral_damping
+        self.u_prev, self.u, self.u_next = u, u_next, u_prev
+
+    def _rotate(self):
+        # Fill the edges of u_next, whose interior is already computed, then
+        # make it the current field
+        u, u_prev, u_next = self.u, self.u_prev, self.u_next
+        if self.boundary_type == "mur":
+            self._apply_mur(u, u_next)
+        else:
+            # Edges are not touched by the stencil and carry over unchanged
+            u_next[0, :] = u[0, :]
+            u_next[-1, :] = u[-1, :]
+            u_next[1:-1, 0] = u[1:-1, 0]
+            u_next[1:-1, -1] = u[1:-1, -1]
+
+        self.u_prev, self.u, self.u_next = u, u_next, u_prev
+
+    def _apply_mur(self, u, u_next):
+        # First-order Mur absorbing boundary: each edge cell is advected
+        # outwards from its inner neighbour, u_next[0] = u[1] + k * (u_next[1] - u[0])
+        # with k = (c*dt - h) / (c*dt + h). Only the current edge rows are needed.
+        kx = (self.c * self.dt - self.dx) / (self.c * self.dt + self.dx)
+        ky = (self.c * self.dt - self.dy) / (self.c * self.dt + self.dy)
+        for edge, inner, k in (((0, slice(1, -1)), (1, slice(1, -1)), ky),
+                               ((-1, slice(1, -1)), (-2, slice(1, -1)), ky),
+                               ((slice(1, -1), 0), (slice(1, -1), 1), kx),
+                               ((slice(1, -1), -1), (slice(1, -1), -2), kx)):
+            out = u_next[edge]
+            np.subtract(u_next[inner], u[edge], out=out)
+            out *= k
+            out += u[inner]
+        # Corners take the mean of their two edge neighbours
+        for row, col, row_in, col_in in ((0, 0, 1, 1), (0, -1, 1, -2), (-1, 0, -2, 1), (-1, -1, -2, -2)):
+            u_next[row, col] = 0.5 * (u_next[row_in, col] + u_next[row, col_in])
+
+    def _require_stepped_kernel(self, sources):
+        if self.kernel == "analytic":
+            raise ValueError(f"The analytic kernel only supports slits, not {sources}.")
 
     def add_obstacle(self, obstacle):
+        self._require_stepped_kernel("obstacles")
         self.obstacles.append(obstacle)
         self.update_boundary()
 
+    def boundary_types(self):
+        # Boundary types the kernel supports; the first one is the default
+        if self.kernel == "spectral":
+            return SPECTRAL_BOUNDARY_TYPES
+        if self.kernel == "analytic":
+            return ANALYTIC_BOUNDARY_TYPES
+        return BOUNDARY_TYPES
+
     def set_boundary_type(self, boundary_type):
-        if boundary_type in ["reflective", "absorbing", "open"]:
-            self.boundary_type = boundary_type
-        else:
-            raise ValueError("Invalid boundary type. Choose 'reflective', 'absorbing', or 'open'.")
+        boundary_types = self.boundary_types()
+        if boundary_type not in boundary_types:
+            choices = [f"'{name}'" for name in boundary_types]
+            if len(choices) > 1:
+                choices = [", ".join(choices[:-1]) + ", or " + choices[-1]]
+            raise ValueError(f"Invalid boundary type for the {self.kernel} kernel. Choose {choices[0]}.")
+        self.boundary_type = boundary_type
+        self.update_damping()
+
+    def set_backend(self, backend):
+        self.backend = get_backend(backend)
 
     def set_depth(self, depth):
         self.depth = depth
         self.c = 10 * np.sqrt(self.depth)  # Update wave speed
-        self.dt = 0.05 * min(self.dx, self.dy) / self.c  # Update time step
+        self.update_dt()  # Update time step
+
+    def set_time_stepping(self, policy, courant=None):
+        if policy not in TIME_STEPPING_POLICIES:
+            raise ValueError("Invalid time stepping policy. Choose 'fixed' or 'cfl'.")
+        if courant is None:
+            courant = self.courant
+        if not 0 < courant <= 1:
+            raise ValueError(f"Courant number {courant} is outside the stable range (0, 1].")
+        self.time_stepping = policy
+        self.courant = courant
+        self.update_dt()
+        self._check_decay()
+
+    def max_stable_dt(self):
+        # Leapfrog stability bound for the 5-point stencil: c*dt*sqrt(1/dx^2 + 1/dy^2) <= 1
+        return 1 / (self.c * np.sqrt(1 / self.dx**2 + 1 / self.dy**2))
+
+    def fixed_dt(self):
+        return FIXED_DT_FACTOR * min(self.dx, self.dy) / self.c
+
+    def update_dt(self):
+        if self.time_stepping == "cfl":
+            self.set_dt(self.courant * self.max_stable_dt())
+        else:
+            self.set_dt(self.fixed_dt())
+
+    def set_dt(self, dt):
+        if not 0 < dt <= self.max_stable_dt():
+            raise ValueError(f"Time step {dt} is outside the stable range (0, {self.max_stable_dt()}].")
+        self.dt = dt
+        # Sources add to u once per step, which in the interior acts as a forcing
+        # term scaled by dt**2; rescale them so their effect is independent of
+        # the step size (see _cell_gains). The decay is rescaled to the same
+        # decay per unit of time (see step_decay).
+        self.source_gain = (dt / self.fixed_dt())**2
+        # Not yet allocated while __init__ sets the first time step
+        if getattr(self, 'damping', None) is not None:
+            self.update_damping()
 
     def set_decay_factor(self, decay_factor):
         self.decay_factor = decay_factor
+        self.update_damping()
+        self._check_decay()
+
+    def _check_decay(self):
+        # The decay multiplies the whole new field once per step, which besides
+        # damping it acts as a restoring term of strength (1 - d) / dt**2. The
+        # rescaled decay matches the damping of the "fixed" policy but not that
+        # term, so with decay_factor < 1 other step sizes give other fields.
+        if self.time_stepping != "fixed" and self.decay_factor < 1:
+            warnings.warn("With decay_factor < 1 the 'cfl' policy does not reproduce the field of the "
+                          "'fixed' policy; use decay_factor=1 to compare them.", stacklevel=3)
 
     def add_wave_packet(self, position, amplitude, frequency, wavelength, width, direction):
-        self.wave_packets.append({
-            'position': position,
-            'amplitude': amplitude,
-            'frequency': frequency,
-            'wavelength': wavelength,
-            'width': width,
-            'direction': direction
-        })
+        self._require_stepped_kernel("wave packets")
+        self.wave_packets.append(position=position, amplitude=amplitude, frequency=frequency,
+                                 wavelength=wavelength, width=width, direction=direction)
 
     def add_interference_point(self, position, amplitude, frequency):
-        self.interference_points.append({
-            'position': position,
-            'amplitude': amplitude,
-            'frequency': frequency
-        })
+        self._require_stepped_kernel("interference points")
+        self.interference_points.append(position=position, amplitude=amplitude, frequency=frequency)
 
     def set_standing_wave_mode(self, mode):
+        if mode is not None:
+            self._require_stepped_kernel("standing waves")
         self.standing_wave_mode = mode
 
     def reset(self):
         self.u.fill(0)
         self.u_prev.fill(0)
+        self.u_next.fill(0)
         self.update_boundary()
         self.update_distance_map()
         self.wave_packets.clear()
@@ -234,6 +768,8 @@ class Tank:
         self.standing_wave_mode = None
 
     def plot(self, ax):
+        import matplotlib.pyplot as plt  # imported here so headless runs never load matplotlib
+
         vmin, vmax = -1, 1  # Fixed scale for better contrast
         im = ax.imshow(self.u, cmap='seismic', animated=True,
                        extent=[0, self.width, 0, self.height],
@@ -254,15 +790,142 @@ class Simulation:
         self.time = 0
         self.time_scale = 1
 
+        # Simulated time owed under the "cfl" policy but shorter than one step
+        self._pending_time = 0.0
+        self.recorder = None
+        # FieldAccumulators fed as the simulation runs (see accumulate)
+        self.accumulators = []
+        # Physical steps taken since the last reset
+        self.steps = 0
+
     def step(self, dt):
-        steps = max(1, int(dt / self.tank.dt))
-        for _ in range(steps):
-            self.time += self.tank.dt * self.time_scale
-            self.tank.update(self.time)
+        if self.tank.time_stepping == "fixed":
+            steps = max(1, int(dt / self.tank.dt))
+        else:
+            # Advance dt * time_scale of simulated time in whole physical steps,
+            # carrying the remainder over to the next call
+            self._pending_time += dt * self.time_scale
+            steps = int(self._pending_time / self.tank.dt)
+            self._pending_time -= steps * self.tank.dt
+        if steps:
+            self.run_steps(steps)
+
+    def run_steps(self, n_steps):
+        self.steps += n_steps
+        observers = list(self.accumulators)
+        if self.recorder is not None:
+            observers.append(self.recorder)
+        if not observers:
+            self.time = self.tank.advance(n_steps, self.time, self.clock_step())
+            return
+        # Stop at every recorded or accumulated frame; splitting the run does
+        # not change it
+        while n_steps:
+            chunk = min([n_steps] + [observer.steps_until_frame() for observer in observers])
+            self.time = self.tank.advance(chunk, self.time, self.clock_step())
+            for observer in observers:
+                observer.advance(chunk, self.tank.u, self.time)
+            n_steps -= chunk
+
+    def record(self, path, every=1, dtype=np.float32, region=None, queue_frames=64):
+        # Start recording every `every`-th field (or a region of it, as a
+        # tuple of slices) to a .npy stack at path; see recording.FrameRecorder
+        from recording import FrameRecorder
+        return FrameRecorder(self, path, every, dtype, region, queue_frames)
+
+    def accumulate(self, every=1, region=None, dtype=np.float64):
+        # Start running statistics of every `every`-th field (or a region of
+        # it); see accumulators.FieldAccumulator
+        from accumulators import FieldAccumulator
+        return FieldAccumulator(self, every, region, dtype)
+
+    def save_checkpoint(self, path):
+        # See checkpoint.load_checkpoint to restore
+        from checkpoint import save_checkpoint
+        save_checkpoint(self, path)
+
+    def stop_recording(self):
+        if self.recorder is not None:
+            self.recorder.close()
+
+    def clock_step(self):
+        # Source-clock advance per physical step
+        if self.tank.time_stepping == "fixed":
+            return self.tank.dt * self.time_scale
+        return self.tank.dt
 
     def set_time_scale(self, scale):
         self.time_scale = scale
 
     def reset(self):
         self.time = 0
+        self._pending_time = 0.0
+        self.steps = 0
         self.tank.reset()
+        for accumulator in self.accumulators:
+            accumulator.reset()
+
+
+def create_simulation(slit_config, depth=1.0, decay_factor=0.999, width=20, height=20,
+                      resolution=200, **tank_options):
+    slits = []
+
+    for side, num_slits in slit_config.items():
+        for i in range(num_slits):
+            if side == 'bottom':
+                x = width * (i + 1) / (num_slits + 1)
+                y = 0
+            elif side == 'top':
+                x = width * (i + 1) / (num_slits + 1)
+                y = height
+            elif side == 'left':
+                x = 0
+                y = height * (i + 1) / (num_slits + 1)
+            elif side == 'right':
+                x = width
+                y = height * (i + 1) / (num_slits + 1)
+
+            slits.append(Slit((x, y), width=0.5, amplitude=10, frequency=1, wavelength=2))
+
+    tank = Tank(width, height, resolution, slits, depth=depth, decay_factor=decay_factor, **tank_options)
+    tank.set_boundary_type(tank.boundary_types()[0])  # Set default boundary type
+    return Simulation(tank)
+
+
+# Scene keys passed straight to the Tank constructor
+SCENE_TANK_OPTIONS = ("depth", "decay_factor", "width", "height", "resolution", "kernel",
+                      "backend", "time_stepping", "courant", "precision")
+
+
+def simulation_from_scene(scene):
+    # Build a Simulation from a scene description (the parsed JSON of a scene
+    # file). "slits" is either a {side: count} mapping, as used by
+    # create_simulation, or a list of explicit slits; all other keys are optional.
+    options = {key: scene[key] for key in SCENE_TANK_OPTIONS if key in scene}
+    slits = scene.get('slits', {})
+    if isinstance(slits, dict):
+        simulation = create_simulation(slits, **options)
+    else:
+        simulation = create_simulation({}, **options)
+        for slit in slits:
+            simulation.tank.slits.append(Slit(tuple(slit['position']), slit['width'], slit['amplitude'],
+                                              slit['frequency'], slit['wavelength']))
+        simulation.tank.update_distance_map()
+
+    tank = simulation.tank
+    tank.set_boundary_type(scene.get('boundary_type', tank.boundary_type))
+    for obstacle in scene.get('obstacles', []):
+        tank.add_obstacle(Obstacle(tuple(obstacle['position']), obstacle['radius']))
+    for packet in scene.get('wave_packets', []):
+        tank.add_wave_packet(tuple(packet['position']), packet['amplitude'], packet['frequency'],
+                             packet['wavelength'], packet['width'], tuple(packet['direction']))
+    for point in scene.get('interference_points', []):
+        tank.add_interference_point(tuple(point['position']), point['amplitude'], point['frequency'])
+    tank.set_standing_wave_mode(scene.get('standing_wave_mode'))
+    simulation.set_time_scale(scene.get('time_scale', 1))
+    return simulation
+
+
+def load_scene(path):
+    with open(path) as f:
+        return simulation_from_scene(json.load(f))
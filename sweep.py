@@ -0,0 +1,177 @@
+import itertools
+import json
+import multiprocessing as mp
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from simulation import create_simulation
+
+# Parameter sweeps over create_simulation scenes, fanned out over a process pool.
+#
+# A grid maps parameter names to lists of values and the sweep runs their
+# cartesian product. Workers return only reduced observables, never fields,
+# and every finished run is appended to an optional JSON-lines manifest so
+# that an interrupted sweep resumes where it stopped. A run that raises is
+# recorded with its error instead of observables and retried on resume.
+
+# Environment variables that cap the thread pools of NumPy's linear algebra
+# libraries; each worker process is pinned to this many threads
+THREAD_LIMIT_VARIABLES = ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS",
+                          "NUMEXPR_NUM_THREADS", "INTERFERENCE_THREADS")
+
+# Parameters understood by build_simulation, in addition to any Tank option
+# accepted by create_simulation
+SWEEP_PARAMETERS = ("slits", "slit_spacing", "wavelength", "frequency", "amplitude",
+                    "boundary_type", "standing_wave_mode", "time_scale")
+
+
+def build_simulation(params):
+    # slits is a {side: count} mapping (default: two slits on the bottom);
+    # slit_spacing re-centres the slits on each side with that spacing
+    options = {key: value for key, value in params.items() if key not in SWEEP_PARAMETERS}
+    simulation = create_simulation(params.get('slits', {'bottom': 2}), **options)
+    tank = simulation.tank
+
+    if 'slit_spacing' in params:
+        spacing = params['slit_spacing']
+        for side in ('bottom', 'top', 'left', 'right'):
+            on_side = [slit for slit in tank.slits if _side(tank, slit) == side]
+            length = tank.width if side in ('bottom', 'top') else tank.height
+            for i, slit in enumerate(on_side):
+                offset = length / 2 + (i - (len(on_side) - 1) / 2) * spacing
+                x, y = slit.position
+                slit.position = (offset, y) if side in ('bottom', 'top') else (x, offset)
+        tank.update_distance_map()
+    for name in ('wavelength', 'frequency', 'amplitude'):
+        if name in params:
+            for slit in tank.slits:
+                setattr(slit, name, params[name])
+
+    tank.set_boundary_type(params.get('boundary_type', tank.boundary_type))
+    tank.set_standing_wave_mode(params.get('standing_wave_mode'))
+    simulation.set_time_scale(params.get('time_scale', 1))
+    return simulation
+
+
+def _side(tank, slit):
+    x, y = slit.position
+    if y == 0:
+        return 'bottom'
+    if y == tank.height:
+        return 'top'
+    return 'left' if x == 0 else 'right'
+
+
+def default_observables(simulation):
+    # Reduced observables: field extrema and energy, plus the intensity along
+    # the row just inside the wall opposite the bottom slits
+    u = simulation.tank.u
+    return {
+        'time': simulation.time,
+        'max_amplitude': float(np.abs(u).max()),
+        'mean_intensity': float(np.mean(u**2)),
+        'far_wall_intensity': (u[-2, :]**2).tolist(),
+    }
+
+
+def run_point(params, steps=None, duration=None, observables=default_observables):
+    simulation = build_simulation(params)
+    if steps is not None:
+        simulation.run_steps(steps)
+    if duration is not None:
+        simulation.step(duration)
+    return observables(simulation)
+
+
+def parameter_grid(grid):
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+
+def point_key(params):
+    return json.dumps(params, sort_keys=True)
+
+
+def load_manifest(path):
+    # Completed runs recorded in a manifest, keyed by point_key; failed runs
+    # and a truncated last line from an interrupted write are ignored
+    done = {}
+    if path is None or not os.path.exists(path):
+        return done
+    with open(path) as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if 'error' in record:
+                continue
+            done[point_key(record['params'])] = record
+    return done
+
+
+def _terminate_last_line(path):
+    # An interrupted write can leave the manifest without a final newline
+    if path is None or not os.path.exists(path) or os.path.getsize(path) == 0:
+        return
+    with open(path, "rb+") as f:
+        f.seek(-1, os.SEEK_END)
+        if f.read(1) != b"\n":
+            f.write(b"\n")
+
+
+def run_sweep(grid, steps=None, duration=None, manifest=None, max_workers=None,
+              threads_per_worker=1, observables=default_observables, progress=None):
+    # Run every point of the grid that is not already in the manifest and
+    # return the records ({'params': ..., 'observables': ...}) in grid order.
+    # A point whose run raised gets {'params': ..., 'error': ...} instead.
+    # observables must be a picklable (module-level) function of a Simulation.
+    if steps is None and duration is None:
+        raise ValueError("A sweep needs steps or duration.")
+    points = parameter_grid(grid)
+    done = load_manifest(manifest)
+    pending = [params for params in points if point_key(params) not in done]
+
+    if pending:
+        _terminate_last_line(manifest)
+        saved_environment = {name: os.environ.get(name) for name in THREAD_LIMIT_VARIABLES}
+        # Spawned workers inherit these before NumPy is imported
+        os.environ.update({name: str(threads_per_worker) for name in THREAD_LIMIT_VARIABLES})
+        try:
+            with ProcessPoolExecutor(max_workers=max_workers, mp_context=mp.get_context("spawn")) as pool, \
+                    open(os.devnull if manifest is None else manifest, "a") as log:
+                futures = {pool.submit(run_point, params, steps, duration, observables): params
+                           for params in pending}
+                for future in as_completed(futures):
+                    try:
+                        record = {'params': futures[future], 'observables': future.result()}
+                    except Exception as exc:
+                        # Keep logging the other runs; a resumed sweep retries this one
+                        record = {'params': futures[future], 'error': f"{type(exc).__name__}: {exc}"}
+                    done[point_key(record['params'])] = record
+                    log.write(json.dumps(record) + "\n")
+                    log.flush()
+                    if progress is not None:
+                        progress(len(done), len(points))
+        finally:
+            for name, value in saved_environment.items():
+                if value is None:
+                    os.environ.pop(name, None)
+                else:
+                    os.environ[name] = value
+
+    return [done[point_key(params)] for params in points]
+
+
+def aggregate(records, grid, name):
+    # Stack one observable into an array shaped like the grid (one axis per
+    # parameter, in grid order), with any per-run array dimensions trailing
+    failed = [record for record in records if 'error' in record]
+    if failed:
+        raise ValueError(f"{len(failed)} sweep runs failed, e.g. {failed[0]['params']}: {failed[0]['error']}")
+    values = [np.asarray(record['observables'][name]) for record in records]
+    shape = tuple(len(grid[parameter]) for parameter in grid)
+    return np.stack(values).reshape(shape + values[0].shape)
+
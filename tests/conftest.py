@@ -0,0 +1,30 @@
+import os
+import sys
+
+import pytest
+
+# The modules live at the top of the repository rather than in a package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from simulation import Obstacle, Simulation, Slit, Tank  # noqa: E402
+
+
+def build_scene(boundary_type="reflective", resolution=60, sources=True, **options):
+    # Slits on all four walls, an obstacle and (for the stepped kernels) every
+    # other kind of source, so that each code path of a step is exercised
+    slits = [Slit((0, 5), 0.5, 1, 1, 2), Slit((10, 0), 0.5, 1, 1.3, 2),
+             Slit((20, 12), 0.7, 0.8, 0.9, 3), Slit((7, 20), 0.5, 1, 1, 2)]
+    tank = Tank(20, 20, resolution, slits, **options)
+    tank.set_boundary_type(boundary_type)
+    if sources:
+        tank.add_obstacle(Obstacle((8, 9), 1.5))
+        tank.add_wave_packet((5, 5), 1, 1, 2, 2, (0.6, -0.3))
+        tank.add_interference_point((12.3, 7.7), 1, 0.7)
+        tank.add_interference_point((3.3, 17.1), 0.5, 1.7)
+        tank.set_standing_wave_mode(2)
+    return Simulation(tank)
+
+
+@pytest.fixture
+def scene():
+    return build_scene
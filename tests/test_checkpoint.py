@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+
+from checkpoint import load_checkpoint
+from conftest import build_scene
+
+STEPS = 30
+
+
+def assert_same_state(actual, expected):
+    np.testing.assert_array_equal(actual.tank.u, expected.tank.u)
+    np.testing.assert_array_equal(actual.tank.u_prev, expected.tank.u_prev)
+    assert actual.time == expected.time
+    assert actual.steps == expected.steps
+
+
+@pytest.mark.filterwarnings("ignore:With decay_factor < 1")
+@pytest.mark.parametrize("mmap_mode", ["c", "r+", None])
+@pytest.mark.parametrize("options", [dict(boundary_type="mur"),
+                                     dict(boundary_type="absorbing", time_stepping="cfl", precision="float32"),
+                                     dict(boundary_type="reflective", kernel="reference")])
+def test_checkpoint_round_trip_continues_bit_for_bit(tmp_path, options, mmap_mode):
+    original = build_scene(**options)
+    original.set_time_scale(1.5)
+    original.run_steps(STEPS)
+    original.save_checkpoint(tmp_path / "state.npz")
+    restored = load_checkpoint(tmp_path / "state.npz", mmap_mode=mmap_mode)
+    assert_same_state(restored, original)
+
+    original.run_steps(STEPS)
+    restored.run_steps(STEPS)
+    assert_same_state(restored, original)
+    assert restored.tank.dtype == original.tank.dtype
+
+
+def test_checkpoint_can_overwrite_the_file_it_was_loaded_from(tmp_path):
+    path = tmp_path / "state.npz"
+    original = build_scene("mur")
+    original.run_steps(STEPS)
+    original.save_checkpoint(path)
+
+    restored = load_checkpoint(path)
+    restored.run_steps(STEPS)
+    restored.save_checkpoint(path)
+    restored.run_steps(STEPS)
+    original.run_steps(2 * STEPS)
+    assert_same_state(restored, original)
+    again = load_checkpoint(path)
+    again.run_steps(STEPS)
+    assert_same_state(again, original)
+
+
+def test_copy_on_write_checkpoint_is_not_modified_by_stepping(tmp_path):
+    path = tmp_path / "state.npz"
+    original = build_scene("open")
+    original.run_steps(STEPS)
+    original.save_checkpoint(path)
+    saved = path.read_bytes()
+    load_checkpoint(path).run_steps(STEPS)
+    assert path.read_bytes() == saved
+
+
+def test_read_only_checkpoint_mapping_is_rejected(tmp_path):
+    build_scene().save_checkpoint(tmp_path / "state.npz")
+    with pytest.raises(ValueError):
+        load_checkpoint(tmp_path / "state.npz", mmap_mode="r")
+
+
+def test_distance_map_stays_lazy_across_a_checkpoint(tmp_path):
+    original = build_scene("reflective", decay_factor=1.0)
+    original.run_steps(STEPS)
+    assert original.tank._distance_map is None
+    original.save_checkpoint(tmp_path / "state.npz")
+    with np.load(tmp_path / "state.npz") as data:
+        assert "distance_map" not in data.files
+    restored = load_checkpoint(tmp_path / "state.npz")
+    assert restored.tank._distance_map is None
+    restored.tank.set_decay_factor(0.99)
+    original.tank.set_decay_factor(0.99)
+    np.testing.assert_array_equal(restored.tank.distance_map, original.tank.distance_map)
+    restored.run_steps(STEPS)
+    original.run_steps(STEPS)
+    assert_same_state(restored, original)
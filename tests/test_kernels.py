@@ -0,0 +1,139 @@
+import numpy as np
+import pytest
+
+from backends import NumbaBackend, ThreadedBackend
+from conftest import build_scene
+from decomposition import DecomposedStepper
+from ensemble import TankEnsemble
+
+BOUNDARY_TYPES = ("reflective", "absorbing", "open", "mur")
+STEPS = 40
+
+
+def assert_same_field(actual, expected):
+    # Bit for bit in float64; float32 kernels may round in a different order
+    if actual.dtype == np.float64:
+        np.testing.assert_array_equal(actual, expected)
+    else:
+        np.testing.assert_allclose(actual, expected, rtol=0, atol=1e-5 * np.abs(expected).max())
+
+
+@pytest.mark.filterwarnings("ignore:With decay_factor < 1")
+@pytest.mark.parametrize("precision", ["float64", "float32"])
+@pytest.mark.parametrize("policy", ["fixed", "cfl"])
+@pytest.mark.parametrize("boundary_type", BOUNDARY_TYPES)
+def test_inplace_kernel_matches_reference(boundary_type, policy, precision):
+    options = dict(time_stepping=policy, precision=precision, decay_factor=0.995)
+    inplace = build_scene(boundary_type, **options)
+    reference = build_scene(boundary_type, kernel="reference", **options)
+    inplace.run_steps(STEPS)
+    reference.run_steps(STEPS)
+    assert_same_field(inplace.tank.u, reference.tank.u)
+    assert inplace.time == reference.time
+
+
+@pytest.mark.parametrize("boundary_type", BOUNDARY_TYPES)
+def test_advance_matches_single_steps(boundary_type):
+    batched = build_scene(boundary_type)
+    stepped = build_scene(boundary_type)
+    batched.run_steps(STEPS)
+    for _ in range(STEPS):
+        stepped.run_steps(1)
+    np.testing.assert_array_equal(batched.tank.u, stepped.tank.u)
+
+
+@pytest.mark.parametrize("backend", ["threaded", "numba"])
+@pytest.mark.parametrize("boundary_type", BOUNDARY_TYPES)
+def test_backends_match_reference(boundary_type, backend):
+    if backend == "numba":
+        pytest.importorskip("numba")
+        instance = NumbaBackend()
+    else:
+        instance = ThreadedBackend(3)
+    stepped = build_scene(boundary_type, backend=instance)
+    reference = build_scene(boundary_type, kernel="reference")
+    stepped.run_steps(STEPS)
+    reference.run_steps(STEPS)
+    np.testing.assert_allclose(stepped.tank.u, reference.tank.u, rtol=0,
+                               atol=1e-12 * np.abs(reference.tank.u).max())
+
+
+@pytest.mark.parametrize("boundary_type", BOUNDARY_TYPES)
+def test_decomposed_stepper_matches_serial(boundary_type):
+    serial = build_scene(boundary_type)
+    decomposed = build_scene(boundary_type)
+    serial.run_steps(STEPS // 2)
+    serial.tank.set_decay_factor(0.99)
+    serial.run_steps(STEPS)
+    with DecomposedStepper(decomposed.tank, 3):
+        decomposed.run_steps(STEPS // 2)
+        # Setters keep working on the shared fields and masks
+        decomposed.tank.set_decay_factor(0.99)
+        decomposed.run_steps(STEPS // 2)
+    # and the fields are handed back to the tank on close
+    decomposed.run_steps(STEPS // 2)
+    np.testing.assert_array_equal(decomposed.tank.u, serial.tank.u)
+    assert decomposed.time == serial.time
+
+
+def test_decomposed_stepper_survives_an_error_in_a_step():
+    simulation = build_scene("mur", sources=False)
+
+    class FailingProbe:
+        def __init__(self):
+            self.samples = 0
+
+        def sample(self, field, time):
+            self.samples += 1
+            if self.samples == 3:
+                raise KeyboardInterrupt
+
+    simulation.tank.probes.append(FailingProbe())
+    with pytest.raises(KeyboardInterrupt):
+        with DecomposedStepper(simulation.tank, 2):
+            simulation.run_steps(10)
+    assert simulation.tank.stepper is None
+
+
+@pytest.mark.filterwarnings("ignore:With decay_factor < 1")
+@pytest.mark.parametrize("policy", ["fixed", "cfl"])
+@pytest.mark.parametrize("boundary_type", BOUNDARY_TYPES)
+def test_ensemble_matches_separate_tanks(boundary_type, policy):
+    def members():
+        tanks = []
+        for k, (depth, decay, frequency) in enumerate([(1.0, 0.999, 1.0), (2.0, 0.99, 1.5), (0.5, 0.995, 0.7)]):
+            tank = build_scene(boundary_type, time_stepping=policy, depth=depth, decay_factor=decay).tank
+            tank.slits[0].frequency = frequency
+            if k == 1:
+                tank.set_standing_wave_mode(None)
+            tanks.append(tank)
+        return tanks
+
+    separate, stacked = members(), members()
+    for tank in separate:
+        tank.advance(STEPS, 0.1, 0.001)
+    times = TankEnsemble(stacked).advance(STEPS, 0.1, 0.001)
+    for a, b in zip(separate, stacked):
+        np.testing.assert_array_equal(a.u, b.u)
+    np.testing.assert_allclose(times, 0.1 + STEPS * 0.001)
+
+
+def test_spectral_kernel_propagates_exactly():
+    # A homogeneous periodic tank: every Fourier mode follows cos(c |k| t)
+    simulation = build_scene("periodic", resolution=64, sources=False, kernel="spectral",
+                             decay_factor=1.0, time_stepping="cfl")
+    tank = simulation.tank
+    tank.slits.clear()
+    x, y = tank.X - 10, tank.Y - 10
+    u0 = np.exp(-(x**2 + y**2) / 4) * np.cos(2 * x)
+    kx = 2 * np.pi * np.fft.fftfreq(tank.resolution, tank.dx)
+    ky = 2 * np.pi * np.fft.fftfreq(tank.resolution, tank.dy)
+    k = np.sqrt(kx**2 + ky[:, np.newaxis]**2)
+
+    def exact(t):
+        return np.real(np.fft.ifft2(np.fft.fft2(u0) * np.cos(tank.c * k * t)))
+
+    tank.u[...] = u0
+    tank.u_prev[...] = exact(-tank.dt)
+    tank.advance(STEPS)
+    np.testing.assert_allclose(tank.u, exact(STEPS * tank.dt), atol=1e-10)
@@ -0,0 +1,95 @@
+import numpy as np
+import pytest
+
+import recording
+from conftest import build_scene
+from probes import Probe, line_probe
+
+STEPS = 40
+
+
+def reference_frames(n_steps, every, **options):
+    # Fields and times of a scene stepped one step at a time, every `every`
+    # steps starting with the initial field
+    simulation = build_scene(**options)
+    fields, times = [simulation.tank.u.copy()], [simulation.time]
+    for step in range(1, n_steps + 1):
+        simulation.run_steps(1)
+        if step % every == 0:
+            fields.append(simulation.tank.u.copy())
+            times.append(simulation.time)
+    return np.array(fields), np.array(times)
+
+
+def test_recorder_writes_every_nth_field(tmp_path, monkeypatch):
+    # A small growth step, so that the file is extended a few times
+    monkeypatch.setattr(recording, "GROWTH_FRAMES", 4)
+    path = tmp_path / "frames.npy"
+    simulation = build_scene("mur")
+    with simulation.record(path, every=3, queue_frames=STEPS) as recorder:
+        simulation.run_steps(STEPS // 2)
+        simulation.run_steps(STEPS // 2)
+    assert recorder.dropped == 0
+
+    fields, times = reference_frames(STEPS, 3, boundary_type="mur")
+    frames = np.load(path)
+    assert frames.dtype == np.float32
+    np.testing.assert_array_equal(frames, fields.astype(np.float32))
+    np.testing.assert_array_equal(np.load(str(path) + ".times.npy"), times)
+
+
+def test_recorder_region(tmp_path):
+    path = tmp_path / "frames.npy"
+    region = (slice(10, 30), slice(5, 50, 2))
+    simulation = build_scene("open")
+    with simulation.record(path, every=2, dtype=np.float64, region=region, queue_frames=STEPS):
+        simulation.run_steps(STEPS)
+    fields, _ = reference_frames(STEPS, 2, boundary_type="open")
+    np.testing.assert_array_equal(np.load(path), fields[(slice(None),) + region])
+
+
+def test_probes_sample_the_field(tmp_path):
+    simulation = build_scene("mur")
+    tank = simulation.tank
+    # Two grid nodes, and a point between nodes that is interpolated
+    nodes = Probe(tank, [(3 * tank.dx, 7 * tank.dy), (20 * tank.dx, 11 * tank.dy)], every=2)
+    between = Probe(tank, [(5.3 * tank.dx, 8.6 * tank.dy)])
+    # A ring buffer that wraps around several times while streaming to a file
+    line = line_probe(tank, "horizontal", 9.5, capacity=7, path=tmp_path / "line.npy")
+    simulation.run_steps(STEPS)
+    line.close()
+
+    fields, times = reference_frames(STEPS, 1, boundary_type="mur")
+    fields, times = fields[1:], times[1:]
+    np.testing.assert_array_equal(nodes.series()[0], times[1::2])
+    np.testing.assert_array_equal(nodes.series()[1], fields[1::2][:, [7, 11], [3, 20]])
+
+    fx, fy = 0.3, 0.6
+    expected = ((1 - fx) * (1 - fy) * fields[:, 8, 5] + fx * (1 - fy) * fields[:, 8, 6]
+                + (1 - fx) * fy * fields[:, 9, 5] + fx * fy * fields[:, 9, 6])
+    np.testing.assert_allclose(between.series()[1][:, 0], expected, rtol=1e-12, atol=1e-15)
+
+    row = int(round(9.5 / tank.dy))
+    np.testing.assert_array_equal(np.load(tmp_path / "line.npy"), fields[:, row])
+    np.testing.assert_array_equal(np.load(str(tmp_path / "line.npy") + ".times.npy"), times)
+    np.testing.assert_array_equal(line.series()[1], fields[-7:, row])
+
+
+@pytest.mark.parametrize("every", [1, 3])
+def test_accumulator_matches_numpy(every):
+    simulation = build_scene("absorbing")
+    accumulator = simulation.accumulate(every=every)
+    simulation.run_steps(STEPS)
+    fields, _ = reference_frames(STEPS, every, boundary_type="absorbing")
+    fields = fields[1:]
+
+    assert accumulator.count == len(fields)
+    scale = np.abs(fields).max()
+    np.testing.assert_allclose(accumulator.mean, fields.mean(axis=0), rtol=0, atol=1e-12 * scale)
+    np.testing.assert_allclose(accumulator.variance(), fields.var(axis=0), rtol=0, atol=1e-12 * scale**2)
+    np.testing.assert_allclose(accumulator.variance(ddof=1), fields.var(axis=0, ddof=1),
+                               rtol=0, atol=1e-12 * scale**2)
+    np.testing.assert_allclose(accumulator.mean_intensity(), (fields**2).mean(axis=0),
+                               rtol=0, atol=1e-12 * scale**2)
+    np.testing.assert_array_equal(accumulator.minimum, fields.min(axis=0))
+    np.testing.assert_array_equal(accumulator.maximum, fields.max(axis=0))
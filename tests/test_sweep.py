@@ -0,0 +1,51 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+from sweep import aggregate, build_simulation, default_observables, run_sweep
+
+GRID = {'resolution': [30], 'boundary_type': ['reflective', 'open', 'mur']}
+STEPS = 10
+
+
+def failing_observables(simulation):
+    # Fails for the boundary type named in the environment, which the spawned
+    # workers inherit
+    if simulation.tank.boundary_type == os.environ.get("SWEEP_TEST_FAILING"):
+        raise RuntimeError("observable failed")
+    return default_observables(simulation)
+
+
+def read_manifest(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_sweep_records_failures_and_resume_retries_only_them(tmp_path, monkeypatch):
+    manifest = tmp_path / "sweep.jsonl"
+    monkeypatch.setenv("SWEEP_TEST_FAILING", "open")
+    records = run_sweep(GRID, steps=STEPS, manifest=manifest, max_workers=2,
+                        observables=failing_observables)
+    assert [record['params']['boundary_type'] for record in records] == GRID['boundary_type']
+    assert records[1]['error'] == "RuntimeError: observable failed"
+    assert 'error' not in records[0] and 'error' not in records[2]
+    with pytest.raises(ValueError):
+        aggregate(records, GRID, 'max_amplitude')
+    assert len(read_manifest(manifest)) == 3
+
+    monkeypatch.delenv("SWEEP_TEST_FAILING")
+    completed = []
+    resumed = run_sweep(GRID, steps=STEPS, manifest=manifest, max_workers=2,
+                        observables=failing_observables, progress=lambda done, total: completed.append(done))
+    assert completed == [3]
+    assert resumed[0] == records[0] and resumed[2] == records[2]
+    assert read_manifest(manifest)[3] == resumed[1]
+
+    # Each run matches the same scene stepped in this process
+    simulation = build_simulation(resumed[1]['params'])
+    simulation.run_steps(STEPS)
+    assert resumed[1]['observables'] == default_observables(simulation)
+    np.testing.assert_array_equal(aggregate(resumed, GRID, 'time'),
+                                  [[record['observables']['time'] for record in resumed]])